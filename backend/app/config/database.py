@@ -1,25 +1,173 @@
-# from sqlalchemy import create_engine
-# from sqlalchemy.ext.declarative import declarative_base
-# from sqlalchemy.orm import sessionmaker
-# import os
-# from dotenv import load_dotenv
-
-# load_dotenv()
-
-# # Get database URL from environment variables or use default SQLite URL
-# DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./memewarriors.db")
-
-# engine = create_engine(
-#     DATABASE_URL, connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-# )
-# SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-# Base = declarative_base()
-
-# # Dependency to get DB session
-# def get_db():
-#     db = SessionLocal()
-#     try:
-#         yield db
-#     finally:
-#         db.close() 
\ No newline at end of file
+import os
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql import Delete, Insert, Update
+from app.config.settings import settings
+
+# Async drivers for the URL schemes used in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def async_database_url(url):
+    """Use the async driver for a plain sqlite:// or postgresql:// URL (explicit drivers are kept)"""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+DATABASE_URL = async_database_url(settings.DATABASE_URL)
+
+def is_sqlite_file(url):
+    """Whether url is an on-disk SQLite database (not :memory:)"""
+    url = make_url(url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+def sqlite_read_only_url(url):
+    """The same SQLite database opened read-only (mode=ro), so reader connections can never take the write lock"""
+    url = make_url(url)
+    return url.set(database=f"file:{url.database}?mode=ro", query={**url.query, "uri": "true"})
+
+def sqlite_pragmas(read_only=False):
+    """Pragmas applied to every SQLite connection
+
+    WAL lets readers run alongside the writer; it is a property of the database
+    file, so only the writer sets it. synchronous=NORMAL is durable in WAL mode
+    except for the last transactions on power loss, and busy_timeout makes
+    writers from other processes wait for the lock instead of failing with
+    "database is locked".
+    """
+    pragmas = [] if read_only else ["journal_mode=WAL"]
+    return pragmas + [
+        f"synchronous={settings.SQLITE_SYNCHRONOUS}",
+        f"busy_timeout={settings.SQLITE_BUSY_TIMEOUT}",
+        f"cache_size=-{settings.SQLITE_CACHE_SIZE_KB}",
+        f"mmap_size={settings.SQLITE_MMAP_SIZE}",
+        "temp_store=MEMORY",
+        "foreign_keys=ON",
+    ]
+
+def _apply_pragmas(engine, pragmas):
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+def create_engines(url):
+    """Build the (writer, reader) engines for url
+
+    On-disk SQLite gets its production profile: a single writer connection, so
+    writes queue for it (in order, without blocking the loop) instead of
+    fighting over the file lock, and a pool of read-only connections. Other
+    databases use one pooled engine for both.
+    """
+    if not is_sqlite_file(url):
+        options = {}
+        if url.startswith("sqlite"):
+            # An in-memory database lives in its one connection, so the dialect's StaticPool is kept
+            options["connect_args"] = {"check_same_thread": False}
+        else:
+            options.update(
+                pool_size=settings.DB_POOL_SIZE,
+                max_overflow=settings.DB_MAX_OVERFLOW,
+                pool_recycle=settings.DB_POOL_RECYCLE,
+                pool_timeout=settings.DB_POOL_TIMEOUT,
+                pool_pre_ping=True,
+            )
+        engine = create_async_engine(url, echo=settings.DB_ECHO, **options)
+        return engine, engine
+
+    # aiosqlite defaults to opening a connection (and thread) per session; pool them instead
+    common = {
+        "echo": settings.DB_ECHO,
+        "connect_args": {"check_same_thread": False},
+        "poolclass": AsyncAdaptedQueuePool,
+        "max_overflow": 0,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    write_engine = create_async_engine(
+        url, pool_size=1, pool_timeout=settings.SQLITE_WRITE_TIMEOUT, **common
+    )
+    read_engine = create_async_engine(
+        sqlite_read_only_url(url), pool_size=settings.SQLITE_READ_POOL_SIZE,
+        pool_timeout=settings.DB_POOL_TIMEOUT, **common
+    )
+    _apply_pragmas(write_engine, sqlite_pragmas())
+    _apply_pragmas(read_engine, sqlite_pragmas(read_only=True))
+    return write_engine, read_engine
+
+engine, read_engine = create_engines(DATABASE_URL)
+
+def create_session_factory(write_engine, read_engine):
+    """Session factory that sends flushes and INSERT/UPDATE/DELETE statements to
+    write_engine and everything else to read_engine
+
+    A session only holds the writer connection from its first write until it
+    commits, so slow requests don't keep other writers waiting. Between the two,
+    its reads also go to the writer, so they see the session's own uncommitted rows.
+    """
+    # expire_on_commit=False keeps attributes loaded after commit, since lazy loads can't run implicitly in async code
+    options = {"class_": AsyncSession, "autoflush": False, "expire_on_commit": False}
+    if read_engine is write_engine:
+        return async_sessionmaker(write_engine, **options)
+
+    class RoutingSession(Session):
+        # Set by the first write of a transaction and cleared when it ends
+        _wrote = False
+
+        def get_bind(self, mapper=None, clause=None, **kwargs):
+            if self._wrote or self._flushing or isinstance(clause, (Insert, Update, Delete)):
+                self._wrote = True
+                return write_engine.sync_engine
+            return read_engine.sync_engine
+
+    @event.listens_for(RoutingSession, "after_transaction_end")
+    def _back_to_readers(session, transaction):
+        if transaction.parent is None:
+            session._wrote = False
+
+    return async_sessionmaker(sync_session_class=RoutingSession, **options)
+
+SessionLocal = create_session_factory(engine, read_engine)
+
+Base = declarative_base()
+
+# Dependency to get DB session
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+# alembic.ini and migrations/ live in the backend directory
+ALEMBIC_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def upgrade_database(connection):
+    """Bring the database on a sync connection up to the latest migration"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(ALEMBIC_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ALEMBIC_DIR, "migrations"))
+    config.attributes["connection"] = connection
+    config.attributes["configure_logger"] = False
+
+    tables = inspect(connection).get_table_names()
+    if "users" in tables and "alembic_version" not in tables:
+        # Created with create_all before migrations existed, which matches the initial revision
+        command.stamp(config, "0001")
+    command.upgrade(config, "head")
+
+async def run_migrations():
+    """Apply pending Alembic migrations (on startup)"""
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade_database)
+
+async def dispose_engine():
+    """Close pooled connections (on shutdown)"""
+    await engine.dispose()
+    if read_engine is not engine:
+        await read_engine.dispose()
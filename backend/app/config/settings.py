@@ -15,6 +15,22 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Database (sqlite:// and postgresql:// URLs use the aiosqlite / asyncpg drivers)
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./memewarriors.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))  # Connections kept open
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Extra connections under load
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+    DB_ECHO: bool = os.getenv("DB_ECHO", "False").lower() == "true"  # Log SQL statements
+    MIGRATE_ON_STARTUP: bool = os.getenv("MIGRATE_ON_STARTUP", "False").lower() == "true"  # Only for single-process servers; deploys run alembic upgrade head
+    # SQLite profile (WAL, one serialized writer connection, read-only reader pool)
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT: int = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # Milliseconds to wait for the file lock
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # Page cache per connection
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))  # Bytes of the file memory-mapped
+    SQLITE_READ_POOL_SIZE: int = int(os.getenv("SQLITE_READ_POOL_SIZE", "4"))  # Read-only connections
+    SQLITE_WRITE_TIMEOUT: float = float(os.getenv("SQLITE_WRITE_TIMEOUT", "60"))  # Seconds a write waits for the writer
+    
     # Blockchain settings - Celo Mainnet (for rewards)
     CELO_MAINNET_RPC_URL: str = os.getenv("CELO_MAINNET_RPC_URL", "https://forno.celo.org")
     REWARD_CONTRACT_ADDRESS: str = os.getenv("REWARD_CONTRACT_ADDRESS", "")
@@ -30,10 +46,75 @@ class Settings(BaseSettings):
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     
+    # OpenAI rate limits (requests per minute / concurrent calls per model) and retries
+    OPENAI_CHAT_RPM: float = float(os.getenv("OPENAI_CHAT_RPM", "3500"))
+    OPENAI_CHAT_CONCURRENCY: int = int(os.getenv("OPENAI_CHAT_CONCURRENCY", "20"))
+    OPENAI_IMAGE_RPM: float = float(os.getenv("OPENAI_IMAGE_RPM", "50"))
+    OPENAI_IMAGE_CONCURRENCY: int = int(os.getenv("OPENAI_IMAGE_CONCURRENCY", "8"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+    OPENAI_RETRY_BASE_DELAY: float = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5"))  # Seconds
+    OPENAI_RETRY_MAX_DELAY: float = float(os.getenv("OPENAI_RETRY_MAX_DELAY", "20"))  # Seconds
+    GENERATION_LATENCY_BUDGET: float = float(os.getenv("GENERATION_LATENCY_BUDGET", "45"))  # Seconds per /meme/generate request
+    BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # Consecutive failures before opening
+    BREAKER_RESET_TIMEOUT: float = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))  # Seconds before a trial call
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "False").lower() == "true"  # Hedge parse/name calls
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "0.95"))  # Recent latency percentile to hedge at
+    HEDGE_MAX_EXTRA_RATIO: float = float(os.getenv("HEDGE_MAX_EXTRA_RATIO", "0.1"))  # Max extra calls per call
+    METERING_RESPONSE_HEADER: bool = os.getenv("METERING_RESPONSE_HEADER", "False").lower() == "true"  # Add X-OpenAI-Usage to responses
+    
+    # AI generation pipeline
+    GENERATION_MAX_CONCURRENCY: int = int(os.getenv("GENERATION_MAX_CONCURRENCY", "4"))  # Items generated at once per process
+    GENERATION_ITEM_TIMEOUT: float = float(os.getenv("GENERATION_ITEM_TIMEOUT", "90"))  # Seconds per item
+    IMAGE_RESPONSE_FORMAT: str = os.getenv("IMAGE_RESPONSE_FORMAT", "url")  # "url" or "b64_json"
+    GENERATION_TIER: str = os.getenv("GENERATION_TIER", "standard")  # "standard" (OpenAI) or "fast" (local pixel art)
+    PROCEDURAL_FALLBACK: bool = os.getenv("PROCEDURAL_FALLBACK", "False").lower() == "true"  # Pixel art when DALL-E fails
+    PARSE_CACHE_SIZE: int = int(os.getenv("PARSE_CACHE_SIZE", "1024"))
+    PARSE_CACHE_TTL: float = float(os.getenv("PARSE_CACHE_TTL", "86400"))  # Seconds
+    PARSE_CACHE_DB_PATH: str = os.getenv("PARSE_CACHE_DB_PATH", "")  # Empty disables the SQLite tier
+    IMAGE_CACHE_ENABLED: bool = os.getenv("IMAGE_CACHE_ENABLED", "False").lower() == "true"
+    IMAGE_CACHE_REUSE_PROBABILITY: float = float(os.getenv("IMAGE_CACHE_REUSE_PROBABILITY", "0.8"))
+    IMAGE_CACHE_MAX_VARIANTS: int = int(os.getenv("IMAGE_CACHE_MAX_VARIANTS", "4"))  # Stored images per icon prompt
+    IMAGE_CACHE_TTL: float = float(os.getenv("IMAGE_CACHE_TTL", "604800"))  # Seconds
+    IMAGE_CACHE_DB_PATH: str = os.getenv("IMAGE_CACHE_DB_PATH", "")
+    WARM_POOL_ENABLED: bool = os.getenv("WARM_POOL_ENABLED", "False").lower() == "true"
+    WARM_POOL_MAX_THEMES: int = int(os.getenv("WARM_POOL_MAX_THEMES", "20"))  # Trending prompts kept in stock
+    WARM_POOL_STOCK: int = int(os.getenv("WARM_POOL_STOCK", "2"))  # Pre-generated results per prompt
+    WARM_POOL_TTL: float = float(os.getenv("WARM_POOL_TTL", "3600"))  # Seconds before stock is discarded
+    WARM_POOL_REFILL_BELOW: int = int(os.getenv("WARM_POOL_REFILL_BELOW", "2"))  # Refill while fewer requests are generating
+    
+    # Outbound HTTP (image downloads)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_TIMEOUT: float = float(os.getenv("HTTP_TIMEOUT", "60"))  # Seconds
+    HTTP_DOWNLOAD_CHUNK_SIZE: int = int(os.getenv("HTTP_DOWNLOAD_CHUNK_SIZE", "65536"))  # Bytes
+    
+    # Image processing
+    IMAGE_POOL_KIND: str = os.getenv("IMAGE_POOL_KIND", "thread")  # "thread" or "process"
+    IMAGE_POOL_WORKERS: int = int(os.getenv("IMAGE_POOL_WORKERS", "2"))
+    COIN_ICON_SIZES: str = os.getenv("COIN_ICON_SIZES", "32,64,128,256")  # Comma separated pixel sizes
+    IMAGE_COMPACTION: bool = os.getenv("IMAGE_COMPACTION", "False").lower() == "true"  # Store pixel art as grid-snapped lossless WebP
+    IMAGE_PALETTE_COLORS: int = int(os.getenv("IMAGE_PALETTE_COLORS", "16"))  # Palette size for compacted pixel art
+    IMAGE_KEEP_ORIGINAL: bool = os.getenv("IMAGE_KEEP_ORIGINAL", "False").lower() == "true"  # Also keep the original PNG under originals/
+    THUMBNAIL_SIZES: str = os.getenv("THUMBNAIL_SIZES", "32,64,128,256,512,1024,2048")  # Widths allowed for /images/{name}?w=
+    THUMBNAIL_CACHE_DIR: str = os.getenv("THUMBNAIL_CACHE_DIR", "./thumbnail_cache")
+    THUMBNAIL_CACHE_MAX_BYTES: int = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", "268435456"))  # 256 MB
+    
     # Redis settings for Celery
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     
+    # Background generation jobs
+    JOB_BACKEND: str = os.getenv("JOB_BACKEND", "inprocess")  # "inprocess" or "celery"
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))  # Worker tasks for the in-process backend
+    JOB_RESULT_TTL: int = int(os.getenv("JOB_RESULT_TTL", "3600"))  # Seconds to keep finished jobs
+    
     # File storage
     MEME_STORAGE_PATH: str = os.getenv("MEME_STORAGE_PATH", "./meme_images")
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "")  # "local", "vercel_blob" or "s3"; empty picks vercel_blob on Vercel, local elsewhere
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # e.g. https://s3.us-east-1.amazonaws.com or http://localhost:9000 (MinIO)
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    S3_PUBLIC_BASE_URL: str = os.getenv("S3_PUBLIC_BASE_URL", "")  # Public URL prefix (e.g. a CDN); defaults to endpoint/bucket
 
 settings = Settings() 
\ No newline at end of file
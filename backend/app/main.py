@@ -1,5 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import os
 import sys
 import time
@@ -7,6 +8,8 @@ import time
 # Detect if we're running in Vercel
 IN_VERCEL = os.environ.get('VERCEL') == '1'
 SKIP_FILE_OPERATIONS = os.environ.get('SKIP_FILE_OPERATIONS') == '1'
+# Every worker runs the startup hook, so migrations only run here when explicitly enabled
+MIGRATE_ON_STARTUP = os.environ.get('MIGRATE_ON_STARTUP', 'False').lower() == 'true'
 
 # Print some debug info
 print(f"Starting FastAPI app in {'Vercel' if IN_VERCEL else 'local'} environment")
@@ -33,16 +36,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Only create directories and mount static files in local environment
-if not IN_VERCEL and not SKIP_FILE_OPERATIONS:
-    from fastapi.staticfiles import StaticFiles
-    try:
-        meme_storage_path = os.environ.get('MEME_STORAGE_PATH', './meme_images')
-        os.makedirs(meme_storage_path, exist_ok=True)
-        app.mount("/images", StaticFiles(directory=meme_storage_path), name="images")
-        print(f"Mounted static files from {meme_storage_path}")
-    except Exception as e:
-        print(f"Warning: Could not set up static files: {str(e)}")
+# Attribute upstream OpenAI usage to the request that caused it
+from app.utils.metering import UsageMiddleware
+app.add_middleware(UsageMiddleware)
 
 # Import and include routers
 try:
@@ -52,18 +48,60 @@ try:
 except Exception as e:
     print(f"Error importing meme_generation router: {e}")
 
+# Serve stored images (with caching headers) unless file operations are disabled
+if not SKIP_FILE_OPERATIONS:
+    try:
+        from app.routers import images
+        app.include_router(images.router)
+        print("Successfully imported and included images router")
+    except Exception as e:
+        print(f"Error importing images router: {e}")
+
 # Only include these routers if not in Vercel, as they depend on web3/aiohttp
 if not IN_VERCEL:
     try:
-        from app.routers import auth, battles, assets, users
+        from app.routers import auth, battles, soldiers, users
         app.include_router(auth.router)
         app.include_router(battles.router)
-        app.include_router(assets.router)
+        app.include_router(soldiers.router)
         app.include_router(users.router)
         print("Successfully imported and included additional routers")
     except Exception as e:
         print(f"Error importing non-essential routers: {e}")
 
+@app.on_event("startup")
+async def startup():
+    """Apply database migrations if MIGRATE_ON_STARTUP is set and start the warm pool refill task if it is enabled"""
+    if MIGRATE_ON_STARTUP and not IN_VERCEL:
+        try:
+            from app.config.database import run_migrations
+            await run_migrations()
+        except Exception as e:
+            print(f"Warning: Could not apply database migrations: {str(e)}")
+    try:
+        from app.utils.ai import warm_pool
+        if warm_pool is not None:
+            warm_pool.start()
+    except Exception as e:
+        print(f"Warning: Could not start warm pool: {str(e)}")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background work and release pooled connections and workers"""
+    from app.utils.ai import warm_pool
+    from app.utils.http import close_http_client
+    from app.utils.images import shutdown_image_executor
+    if warm_pool is not None:
+        await warm_pool.stop()
+    await close_http_client()
+    shutdown_image_executor()
+    if not IN_VERCEL:
+        try:
+            from app.config.database import dispose_engine
+            await dispose_engine()
+        except Exception as e:
+            print(f"Warning: Could not close database connections: {str(e)}")
+
 @app.get("/")
 async def root():
     return {
@@ -73,6 +111,12 @@ async def root():
         "environment": "Vercel" if IN_VERCEL else "Development"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """OpenAI call, token, image, cost and latency counters in the Prometheus text format"""
+    from app.utils.metering import meter
+    return PlainTextResponse(meter.render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.get("/minimal-test")
 async def minimal_test():
     """The most basic test endpoint that doesn't use any filesystem operations or external dependencies"""
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Enum, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -12,16 +12,24 @@ class BattleStatus(str, enum.Enum):
 
 class Battle(Base):
     __tablename__ = "battles"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
+    __table_args__ = (
+        # Active (or pending) battles by end time
+        Index("ix_battles_status_end_time", "status", "end_time"),
+        # Battle listings, newest first, with and without a status
+        Index("ix_battles_status_created_at", "status", "created_at"),
+        Index("ix_battles_created_at", "created_at"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
     description = Column(Text)
     status = Column(Enum(BattleStatus), default=BattleStatus.PENDING)
     
     start_time = Column(DateTime(timezone=True))
     end_time = Column(DateTime(timezone=True))
     
-    winner_id = Column(Integer, ForeignKey("battle_participants.id"), nullable=True)
+    # Added after both tables exist, since battle_participants references battles too
+    winner_id = Column(Integer, ForeignKey("battle_participants.id", use_alter=True, name="fk_battles_winner_id"), nullable=True)
     transaction_hash = Column(String, nullable=True)  # Blockchain transaction hash
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -33,8 +41,14 @@ class Battle(Base):
 
 class BattleParticipant(Base):
     __tablename__ = "battle_participants"
-    
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        # A battle's participants ranked by votes
+        Index("ix_battle_participants_battle_id_votes", "battle_id", "votes"),
+        # A soldier joins a battle at most once; also serves lookups by soldier within a battle
+        Index("uq_battle_participants_battle_id_soldier_id", "battle_id", "soldier_id", unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
     battle_id = Column(Integer, ForeignKey("battles.id"))
     soldier_id = Column(Integer, ForeignKey("meme_soldiers.id"))
     
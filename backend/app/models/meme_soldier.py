@@ -1,21 +1,29 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.config.database import Base
 
 class MemeSoldier(Base):
     __tablename__ = "meme_soldiers"
+    __table_args__ = (
+        # A user's soldiers, newest first (also serves lookups by owner_id alone)
+        Index("ix_meme_soldiers_owner_id_created_at", "owner_id", "created_at"),
+        # Soldiers on (or off) the battlefield, newest first
+        Index("ix_meme_soldiers_deployed_created_at", "deployed_to_battlefield", "created_at"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
     token_id = Column(String, index=True)  # Blockchain token ID
-    name = Column(String, index=True)
+    name = Column(String)
     image_url = Column(String)
     prompt = Column(Text)
+    provider = Column(String, nullable=True)  # Image provider that made the image ("openai" or "pixel")
     
     # Blockchain info
     contract_address = Column(String)
     coin_icon_url = Column(String)  # URL to the meme soldier's coin icon
+    coin_icon_variants = Column(JSON, nullable=True)  # {size: URL} of the resized coin icons
     deployed_to_battlefield = Column(Boolean, default=False)
     token_amount = Column(Float)  # Total token amount
     token_amount_deployed = Column(Float)  # Amount in battlefield
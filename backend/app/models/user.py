@@ -6,9 +6,9 @@ from app.config.database import Base
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     wallet_address = Column(String, unique=True, index=True)
-    nonce = Column(String, index=True)  # For wallet authentication
+    nonce = Column(String)  # For wallet authentication (only ever read from the user's row)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.database import get_db
 from app.utils.auth import generate_nonce, verify_signature, create_access_token
 from app.models.user import User
@@ -13,27 +14,25 @@ router = APIRouter(
 )
 
 @router.get("/nonce/{wallet_address}")
-async def get_wallet_nonce(wallet_address: str, db: Session = Depends(get_db)):
+async def get_wallet_nonce(wallet_address: str, db: AsyncSession = Depends(get_db)):
     """Get or create a nonce for the specified wallet address"""
     # For testing purposes, allow any wallet address without verification
     # In a real implementation, this would verify the wallet address format
     
     # Check if user exists
-    user = db.query(User).filter(User.wallet_address == wallet_address).first()
+    user = await db.scalar(select(User).where(User.wallet_address == wallet_address))
     
     if not user:
         # Create new user with a new nonce
         new_nonce = generate_nonce()
         user = User(wallet_address=wallet_address, nonce=new_nonce)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
     else:
         # Update existing user's nonce
         new_nonce = generate_nonce()
         user.nonce = new_nonce
-        db.commit()
-        db.refresh(user)
+        await db.commit()
     
     return {"wallet_address": wallet_address, "nonce": user.nonce}
 
@@ -41,20 +40,19 @@ async def get_wallet_nonce(wallet_address: str, db: Session = Depends(get_db)):
 async def verify_wallet_signature(
     wallet_address: str, 
     signature: str = "mock_signature",  # Allow mock signature for testing
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Verify a wallet signature and return an access token"""
     # For frontend testing, we'll accept any signature
     # In a real implementation, this would verify the signature
     
-    user = db.query(User).filter(User.wallet_address == wallet_address).first()
+    user = await db.scalar(select(User).where(User.wallet_address == wallet_address))
     if not user:
         # For frontend testing, create a user if not exists
         new_nonce = generate_nonce()
         user = User(wallet_address=wallet_address, nonce=new_nonce)
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -64,6 +62,6 @@ async def verify_wallet_signature(
     
     # Generate a new nonce for next login
     user.nonce = generate_nonce()
-    db.commit()
+    await db.commit()
     
     return {"access_token": access_token, "token_type": "bearer"} 
\ No newline at end of file
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import datetime
+from app.config.database import get_db
+from app.models.battle import Battle, BattleStatus
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, keyset_page, page_result
+
+router = APIRouter(
+    prefix="/battles",
+    tags=["battles"],
+)
+
+# Only what a list view shows; the description is left for the detail view
+LIST_COLUMNS = (
+    Battle.id,
+    Battle.name,
+    Battle.status,
+    Battle.start_time,
+    Battle.end_time,
+    Battle.winner_id,
+    Battle.created_at,
+)
+
+@router.get("", response_model=dict)
+async def list_battles(
+    status: Optional[BattleStatus] = Query(None, description="Only battles with this status"),
+    starts_before: Optional[datetime] = Query(None, description="Only battles starting before this time"),
+    ends_after: Optional[datetime] = Query(None, description="Only battles ending after this time (e.g. now for running battles)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """List battles, newest first, optionally by status and time
+
+    Pages are fetched with a cursor instead of an offset. Pass next_cursor back
+    as cursor to get the next page; it is null on the last one.
+    """
+    query = select(*LIST_COLUMNS)
+    if status is not None:
+        query = query.where(Battle.status == status)
+    if starts_before is not None:
+        query = query.where(Battle.start_time < starts_before)
+    if ends_after is not None:
+        query = query.where(Battle.end_time > ends_after)
+
+    try:
+        query = keyset_page(query, Battle.created_at, Battle.id, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows, next_cursor = page_result((await db.execute(query)).all(), limit)
+    return {
+        "success": True,
+        "items": [dict(row._mapping) for row in rows],
+        "next_cursor": next_cursor
+    }
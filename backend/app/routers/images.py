@@ -0,0 +1,158 @@
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import RedirectResponse, Response
+from typing import Optional
+import asyncio
+import mimetypes
+import os
+
+from app.utils.storage import IMMUTABLE_CACHE_CONTROL, LocalStorage, get_storage, is_content_key
+from app.utils.thumbnails import THUMBNAIL_WIDTHS, get_thumbnail
+
+# Define a router with tags
+router = APIRouter(
+    prefix="/images",
+    tags=["images"],
+)
+
+MEDIA_TYPES = {
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+# Images stored before names were content-hashed can still be cached, just not forever
+LEGACY_CACHE_CONTROL = "public, max-age=86400"
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_range(header, size):
+    """Parse a Range header into an inclusive (start, end) byte range
+
+    Returns None when the whole file should be sent (malformed or multi-range
+    headers are ignored, as RFC 9110 allows), and raises RangeNotSatisfiable
+    when the range lies outside the file.
+    """
+    units, _, spec = header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, end
+
+def etag_matches(header, etag):
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+    if header.strip() == "*":
+        return True
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def _read(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+@router.api_route("/{name}", methods=["GET", "HEAD"])
+async def get_image(
+    name: str,
+    request: Request,
+    w: Optional[int] = Query(None, description="Width in pixels of a resized variant (see THUMBNAIL_SIZES)")
+):
+    """Serve a stored image or coin icon, optionally resized to width w
+
+    Content-hashed names are served with Cache-Control: immutable and a strong
+    ETag (the hash itself). Supports If-None-Match (304) and single byte
+    Range requests (206). Images in remote storage are redirected to, unless
+    a resized variant is requested.
+
+    Resized variants are rendered on first request and served from an on-disk
+    LRU cache afterwards. Pixel art is scaled without blurring.
+    """
+    if name.startswith(".") or "/" in name or "\\" in name:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if w is not None and w not in THUMBNAIL_WIDTHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported width {w}, use one of {', '.join(str(width) for width in THUMBNAIL_WIDTHS)}"
+        )
+
+    storage = get_storage()
+    if storage is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    stem = os.path.splitext(name)[0]
+    if w is not None:
+        path = await get_thumbnail(name, w)
+        etag_base = f"{stem}-w{w}"
+    elif isinstance(storage, LocalStorage):
+        path = storage.local_path(name)
+        etag_base = stem
+    else:
+        return RedirectResponse(storage.url(name), headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL})
+
+    try:
+        stat = os.stat(path) if path is not None else None
+    except FileNotFoundError:
+        stat = None
+    if stat is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    if is_content_key(name):
+        etag = f'"{etag_base}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        cache_control = LEGACY_CACHE_CONTROL
+    media_type = MEDIA_TYPES.get(os.path.splitext(name)[1].lower()) or mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return await serve_file(request, path, stat.st_size, etag, cache_control, media_type)
+
+async def serve_file(request, path, size, etag, cache_control, media_type):
+    """Respond with the file at path, honouring If-None-Match, Range and HEAD"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = end - start + 1
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+    body = await asyncio.get_running_loop().run_in_executor(None, _read, path, start, length)
+    return Response(content=body, status_code=status_code, headers=headers, media_type=media_type)
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional
+import json
 import os
 import time
 
@@ -16,13 +18,13 @@ IN_VERCEL = os.environ.get('VERCEL') == '1'
 if not IN_VERCEL:
     # These imports might fail in Vercel, but that's ok as they're not used there
     try:
-        from fastapi import Depends, HTTPException, status
-        from sqlalchemy.orm import Session
+        from sqlalchemy import select
+        from sqlalchemy.ext.asyncio import AsyncSession
         from app.config.database import get_db
         from app.utils.auth import get_current_user
         from app.models.user import User
         from app.models.meme_soldier import MemeSoldier
-        from app.schemas.meme_soldier import MemeSoldierGeneration, MemeSoldierGenerationResponse
+        from app.schemas.meme_soldier import MemeSoldierGeneration
     except ImportError as e:
         print(f"Error importing database dependencies: {e}")
 else:
@@ -31,20 +33,55 @@ else:
     from typing import Any
     
     # Define a Session type for Vercel environment to avoid "Session not defined" error
-    Session = Any
+    AsyncSession = Any
+    
+    # There is no database in Vercel, so these dependencies resolve to None
+    async def get_db():
+        return None
+    
+    async def get_current_user():
+        return None
     
     class MemeSoldierGeneration(BaseModel):
         prompt: str
 
 # Import AI utilities which should work in both environments
-from app.utils.ai import generate_meme_image, generate_meme_soldier_name
+from app.utils.ai import (
+    generate_meme_image, generate_meme_image_events, get_parse_cache_stats, get_image_cache_stats, get_singleflight_stats,
+    get_upstream_stats, get_warm_pool_stats, generation_latency_budget
+)
+from app.utils.jobs import enqueue_generation_job, get_generation_job, insert_generated_items, response_item
+from app.utils.metering import set_user
+from app.utils.thumbnails import get_thumbnail_cache_stats
+
+async def resolve_user(db, current_user, test_mode):
+    """Return the authenticated user, or in test mode a shared test user if there is none"""
+    if current_user or not test_mode:
+        return current_user
+    
+    # Get or create a test user
+    test_wallet = "0xTEST1234567890abcdef1234567890abcdef12345678"
+    test_user = await db.scalar(select(User).where(User.wallet_address == test_wallet))
+    
+    if not test_user:
+        # Create a test user
+        from app.utils.auth import generate_nonce
+        test_user = User(
+            wallet_address=test_wallet,
+            nonce=generate_nonce(),
+            is_active=True
+        )
+        db.add(test_user)
+        await db.commit()
+    return test_user
 
 @router.post("/generate", response_model=None)
 async def generate_meme(
     request: MemeSoldierGeneration,
-    db: Session = None,
-    current_user: Optional[object] = None,
-    test_mode: bool = Query(False, description="Set to true to bypass authentication (for frontend testing)")
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[object] = Depends(get_current_user),
+    test_mode: bool = Query(False, description="Set to true to bypass authentication (for frontend testing)"),
+    tier: Optional[str] = Query(None, pattern="^(standard|fast)$", description="standard (DALL-E) or fast (local pixel art); defaults to GENERATION_TIER")
 ):
     """Generate meme images and names based on a prompt
     
@@ -59,8 +96,10 @@ async def generate_meme(
     try:
         # For Vercel environment, use simplified flow without DB
         if IN_VERCEL:
-            # Generate the meme images
-            image_result = await generate_meme_image(request.prompt)
+            # Generate the meme images (names are generated alongside them)
+            image_result = await generate_meme_image(
+                request.prompt, include_names=True, budget=generation_latency_budget, tier=tier
+            )
             
             if not image_result["success"]:
                 # Return error instead of raising exception
@@ -69,19 +108,8 @@ async def generate_meme(
                     "error": image_result.get("error", "Failed to generate images")
                 }
                 
-            # Generate names for each item
-            result_items = []
-            for item in image_result["items"]:
-                # Generate a name for this meme soldier
-                name = generate_meme_soldier_name(item["prompt"])
-                
-                result_items.append({
-                    "id": 999,  # Dummy ID for Vercel
-                    "name": name,
-                    "prompt": item["prompt"],
-                    "image_url": item["image_url"],
-                    "coin_icon_url": item["coin_icon_url"]
-                })
+            # Not saved in Vercel, so the items get the dummy ID
+            result_items = [response_item(item) for item in image_result["items"]]
             
             return {
                 "success": True,
@@ -89,35 +117,22 @@ async def generate_meme(
             }
             
         # For non-Vercel environments with database
-        # For testing mode, use a default user if no authentication provided
-        if test_mode and not current_user:
-            # Get or create a test user
-            test_wallet = "0xTEST1234567890abcdef1234567890abcdef12345678"
-            test_user = db.query(User).filter(User.wallet_address == test_wallet).first()
-            
-            if not test_user:
-                # Create a test user
-                from app.utils.auth import generate_nonce
-                test_user = User(
-                    wallet_address=test_wallet,
-                    nonce=generate_nonce(),
-                    is_active=True
-                )
-                db.add(test_user)
-                db.commit()
-                db.refresh(test_user)
-            
-            current_user = test_user
-        
-        # Regular authentication check for non-test mode
-        if not test_mode and not current_user:
+        current_user = await resolve_user(db, current_user, test_mode)
+        if not current_user:
             return {
                 "success": False,
                 "error": "Authentication required"
             }
         
-        # Generate the meme images
-        image_result = await generate_meme_image(request.prompt)
+        set_user(current_user.id)
+        
+        # End the read transaction so no pooled connection is held while generating
+        await db.commit()
+        
+        # Generate the meme images (names are generated alongside them)
+        image_result = await generate_meme_image(
+            request.prompt, include_names=True, budget=generation_latency_budget, tier=tier
+        )
         
         if not image_result["success"]:
             return {
@@ -125,35 +140,8 @@ async def generate_meme(
                 "error": image_result.get("error", "Failed to generate images")
             }
             
-        # Generate names and create records for each item
-        result_items = []
-        for item in image_result["items"]:
-            # Generate a name for this meme soldier
-            name = generate_meme_soldier_name(item["prompt"])
-            
-            # Create a database record for this meme soldier
-            meme_soldier = MemeSoldier(
-                owner_id=current_user.id,
-                name=name,
-                prompt=item["prompt"],
-                image_url=item["image_url"],
-                coin_icon_url=item["coin_icon_url"],
-                deployed_to_battlefield=False,
-                token_amount=0,  # Will be set when minted
-                token_amount_deployed=0
-            )
-            
-            db.add(meme_soldier)
-            db.commit()
-            db.refresh(meme_soldier)
-            
-            result_items.append({
-                "id": meme_soldier.id,
-                "name": meme_soldier.name,
-                "prompt": meme_soldier.prompt,
-                "image_url": meme_soldier.image_url,
-                "coin_icon_url": meme_soldier.coin_icon_url
-            })
+        # Save all items in one transaction
+        result_items = await insert_generated_items(db, current_user.id, image_result["items"])
         
         return {
             "success": True,
@@ -161,15 +149,104 @@ async def generate_meme(
         }
     except Exception as e:
         if db:
-            db.rollback()
+            await db.rollback()
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
+@router.post("/generate/stream")
+async def generate_meme_stream(
+    request: MemeSoldierGeneration,
+    tier: Optional[str] = Query(None, pattern="^(standard|fast)$", description="standard (DALL-E) or fast (local pixel art); defaults to GENERATION_TIER")
+):
+    """Stream meme generation progress as newline-delimited JSON (NDJSON)
+    
+    Emits a "parsed" event with the 2 parsed items, then an "item" event for each
+    meme soldier (image URL, coin icon and name) as soon as it is ready, then a
+    final "done" event. Results are not saved to the database.
+    """
+    async def events():
+        try:
+            async for event in generate_meme_image_events(request.prompt, tier=tier):
+                if event["event"] == "item":
+                    # Streamed items are not persisted, so they get the dummy ID
+                    event["item"] = response_item(event["item"])
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "done", "success": False, "count": 0, "error": str(e)}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/jobs", response_model=None)
+async def create_generation_job(
+    request: MemeSoldierGeneration,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[object] = Depends(get_current_user),
+    test_mode: bool = Query(False, description="Set to true to bypass authentication (for frontend testing)")
+):
+    """Queue a meme generation in the background and return its job id
+    
+    Poll GET /meme/jobs/{job_id} for progress and results. The generated meme
+    soldiers are saved for the current user (there is no database in Vercel,
+    so there they are only returned).
+    """
+    try:
+        owner_id = None
+        if not IN_VERCEL:
+            current_user = await resolve_user(db, current_user, test_mode)
+            if not current_user:
+                return {
+                    "success": False,
+                    "error": "Authentication required"
+                }
+            owner_id = current_user.id
+            # End the read transaction so no pooled connection is held while the job is queued
+            await db.commit()
+        
+        job_id = await enqueue_generation_job(request.prompt, owner_id)
+        return {
+            "success": True,
+            "job_id": job_id,
+            "status": "queued"
+        }
+    except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
 
+@router.get("/jobs/{job_id}", response_model=None)
+async def get_generation_job_status(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: Optional[object] = Depends(get_current_user),
+    test_mode: bool = Query(False, description="Set to true to bypass authentication (for frontend testing)")
+):
+    """Get the status, progress and results of one of the current user's generation jobs
+    
+    Jobs of other users are reported as not found.
+    """
+    job = await get_generation_job(job_id)
+    if job is not None and not IN_VERCEL:
+        current_user = await resolve_user(db, current_user, test_mode)
+        if current_user is None or job.get("owner_id") != current_user.id:
+            job = None
+    if job is None:
+        return {
+            "success": False,
+            "error": "Job not found"
+        }
+    job.pop("owner_id", None)
+    return {
+        "success": True,
+        "job": job
+    }
+
 @router.post("/generate_test", response_model=None)
 async def generate_meme_test(
-    request: MemeSoldierGeneration
+    request: MemeSoldierGeneration,
+    tier: Optional[str] = Query(None, pattern="^(standard|fast)$", description="standard (DALL-E) or fast (local pixel art); defaults to GENERATION_TIER")
 ):
     """Test endpoint to generate meme images without authentication or database storage
     
@@ -187,8 +264,10 @@ async def generate_meme_test(
         debug_info["prompt"] = request.prompt
         debug_info["generating_images"] = "attempting"
         
-        # Generate images (this is now async)
-        image_result = await generate_meme_image(request.prompt)
+        # Generate images and names concurrently
+        image_result = await generate_meme_image(
+            request.prompt, include_names=True, budget=generation_latency_budget, tier=tier
+        )
         debug_info["generating_images"] = "completed"
         debug_info["image_result_success"] = image_result["success"]
         
@@ -207,18 +286,10 @@ async def generate_meme_test(
         
         for idx, item in enumerate(image_result["items"]):
             try:
-                # Generate a name for this meme soldier
                 debug_info[f"item_{idx}_prompt"] = item["prompt"]
-                name = generate_meme_soldier_name(item["prompt"])
-                debug_info[f"item_{idx}_name"] = name
+                debug_info[f"item_{idx}_name"] = item["name"]
                 
-                result_items.append({
-                    "id": 999,  # Dummy ID
-                    "name": name,
-                    "prompt": item["prompt"],
-                    "image_url": item["image_url"],
-                    "coin_icon_url": item["coin_icon_url"]
-                })
+                result_items.append(response_item(item))
             except Exception as item_error:
                 debug_info[f"item_{idx}_error"] = str(item_error)
                 # Continue with next item
@@ -245,15 +316,15 @@ if not IN_VERCEL:
     @router.post("/mint/{soldier_id}", response_model=None)
     async def mint_soldier(
         soldier_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: User = Depends(get_current_user)
     ):
         """Mint a meme soldier token on the blockchain (placeholder)"""
         # Get the soldier from the database
-        soldier = db.query(MemeSoldier).filter(
+        soldier = await db.scalar(select(MemeSoldier).where(
             MemeSoldier.id == soldier_id,
             MemeSoldier.owner_id == current_user.id
-        ).first()
+        ))
         
         if not soldier:
             # Return error response instead of raising an exception
@@ -278,4 +349,24 @@ async def test_endpoint():
         "message": "Meme generation router is functioning",
         "time": time.time() if 'time' in globals() else None,
         "vercel": IN_VERCEL
-    } 
\ No newline at end of file
+    }
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters for the generation caches"""
+    return {
+        "success": True,
+        "parse_cache": get_parse_cache_stats(),
+        "image_cache": get_image_cache_stats(),
+        "singleflight": get_singleflight_stats(),
+        "warm_pool": get_warm_pool_stats(),
+        "thumbnails": get_thumbnail_cache_stats()
+    }
+
+@router.get("/upstream/stats")
+async def upstream_stats():
+    """Rate limit, retry and latency metrics per model, circuit breaker states and hedging counters"""
+    return {
+        "success": True,
+        **get_upstream_stats()
+    }
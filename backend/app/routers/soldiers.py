@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.config.database import get_db
+from app.models.meme_soldier import MemeSoldier
+from app.models.user import User
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, keyset_page, page_result
+
+router = APIRouter(
+    prefix="/soldiers",
+    tags=["soldiers"],
+)
+
+# Only what a list view shows; the prompt and icon variants are left for the detail view
+LIST_COLUMNS = (
+    MemeSoldier.id,
+    MemeSoldier.owner_id,
+    MemeSoldier.name,
+    MemeSoldier.image_url,
+    MemeSoldier.coin_icon_url,
+    MemeSoldier.provider,
+    MemeSoldier.deployed_to_battlefield,
+    MemeSoldier.token_amount,
+    MemeSoldier.created_at,
+)
+
+@router.get("", response_model=dict)
+async def list_soldiers(
+    wallet_address: Optional[str] = Query(None, description="Only soldiers owned by this wallet"),
+    deployed: Optional[bool] = Query(None, description="Only soldiers that are (or aren't) deployed to the battlefield"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """List meme soldiers, newest first, by owner and/or deployed status
+
+    Pages are fetched with a cursor instead of an offset, so every page takes
+    the same time however many soldiers a wallet has. Pass next_cursor back as
+    cursor to get the next page; it is null on the last one.
+    """
+    if wallet_address is None and deployed is None:
+        raise HTTPException(status_code=400, detail="Filter by wallet_address and/or deployed")
+
+    query = select(*LIST_COLUMNS)
+    if wallet_address is not None:
+        owner_id = await db.scalar(select(User.id).where(User.wallet_address == wallet_address))
+        if owner_id is None:
+            return {"success": True, "items": [], "next_cursor": None}
+        query = query.where(MemeSoldier.owner_id == owner_id)
+    if deployed is not None:
+        query = query.where(MemeSoldier.deployed_to_battlefield == deployed)
+
+    try:
+        query = keyset_page(query, MemeSoldier.created_at, MemeSoldier.id, cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows, next_cursor = page_result((await db.execute(query)).all(), limit)
+    return {
+        "success": True,
+        "items": [dict(row._mapping) for row in rows],
+        "next_cursor": next_cursor
+    }
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.config.database import get_db
 from app.utils.auth import get_current_user
 from app.models.user import User
@@ -12,7 +12,7 @@ router = APIRouter(
 
 @router.get("/me", response_model=dict)
 async def get_current_user_info(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get current user information (placeholder)"""
@@ -38,7 +38,7 @@ async def get_current_user_info(
 
 @router.get("/leaderboard", response_model=dict)
 async def get_leaderboard(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get user leaderboard (placeholder)"""
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, Dict
 from datetime import datetime
 
 class MemeSoldierBase(BaseModel):
@@ -13,6 +13,7 @@ class MemeSoldierUpdate(BaseModel):
     name: Optional[str] = None
     image_url: Optional[str] = None
     coin_icon_url: Optional[str] = None
+    coin_icon_variants: Optional[Dict[str, str]] = None
     token_id: Optional[str] = None
     contract_address: Optional[str] = None
     deployed_to_battlefield: Optional[bool] = None
@@ -26,6 +27,8 @@ class MemeSoldierInDB(MemeSoldierBase):
     token_id: Optional[str] = None
     contract_address: Optional[str] = None
     coin_icon_url: Optional[str] = None
+    coin_icon_variants: Optional[Dict[str, str]] = None
+    provider: Optional[str] = None
     deployed_to_battlefield: bool
     token_amount: float = 0.0
     token_amount_deployed: float = 0.0
@@ -46,4 +49,6 @@ class MemeSoldierGenerationResponse(BaseModel):
     name: str
     image_url: str
     prompt: str
-    coin_icon_url: Optional[str] = None 
\ No newline at end of file
+    coin_icon_url: Optional[str] = None
+    coin_icon_variants: Optional[Dict[str, str]] = None
+    provider: Optional[str] = None
\ No newline at end of file
@@ -1,43 +1,119 @@
 import os
-import requests
+import json
+import base64
 import time
 import random
 import string
 import asyncio
-from io import BytesIO
-
-try:
-    from PIL import Image
-except ImportError:
-    print("PIL not available, image processing features will be limited")
+from urllib.parse import unquote, urlsplit
+from app.utils.cache import (
+    LRUTTLCache, SQLiteCache, TieredCache, ImageCache, normalize_prompt, image_cache_key
+)
+from app.utils.singleflight import SingleFlight
+from app.utils.warm_pool import WarmPool
+from app.utils.http import download_bytes, download_to_file
+from app.utils.images import (
+    DEFAULT_COIN_ICON_SIZE, coin_icon_sizes, compact_pixel_art, image_compaction, image_keep_original,
+    image_palette_colors, render_coin_icons, run_image_task
+)
+from app.utils.storage import LocalStorage, content_key, get_storage, is_content_key
+from app.utils.pixel_art import render_sprite, sprite_name
+from app.utils.upstream import (
+    UpstreamClient, UpstreamUnavailable, CircuitBreaker, Hedger, guarded_call, latency_budget,
+    remaining_budget
+)
+from app.utils.metering import meter, usage_context, usage_from_response
 
 # Initialize OpenAI client with fallback to environment variables
 try:
     from app.config.settings import settings
     api_key = settings.OPENAI_API_KEY
-    meme_storage_path = settings.MEME_STORAGE_PATH
+    generation_max_concurrency = settings.GENERATION_MAX_CONCURRENCY
+    generation_item_timeout = settings.GENERATION_ITEM_TIMEOUT
+    image_response_format = settings.IMAGE_RESPONSE_FORMAT
+    generation_tier = settings.GENERATION_TIER
+    procedural_fallback = settings.PROCEDURAL_FALLBACK
+    openai_chat_rpm = settings.OPENAI_CHAT_RPM
+    openai_chat_concurrency = settings.OPENAI_CHAT_CONCURRENCY
+    openai_image_rpm = settings.OPENAI_IMAGE_RPM
+    openai_image_concurrency = settings.OPENAI_IMAGE_CONCURRENCY
+    openai_max_retries = settings.OPENAI_MAX_RETRIES
+    openai_retry_base_delay = settings.OPENAI_RETRY_BASE_DELAY
+    openai_retry_max_delay = settings.OPENAI_RETRY_MAX_DELAY
+    generation_latency_budget = settings.GENERATION_LATENCY_BUDGET
+    breaker_failure_threshold = settings.BREAKER_FAILURE_THRESHOLD
+    breaker_reset_timeout = settings.BREAKER_RESET_TIMEOUT
+    hedge_enabled = settings.HEDGE_ENABLED
+    hedge_percentile = settings.HEDGE_PERCENTILE
+    hedge_max_extra_ratio = settings.HEDGE_MAX_EXTRA_RATIO
+    warm_pool_enabled = settings.WARM_POOL_ENABLED
+    warm_pool_max_themes = settings.WARM_POOL_MAX_THEMES
+    warm_pool_stock = settings.WARM_POOL_STOCK
+    warm_pool_ttl = settings.WARM_POOL_TTL
+    warm_pool_refill_below = settings.WARM_POOL_REFILL_BELOW
+    parse_cache_size = settings.PARSE_CACHE_SIZE
+    parse_cache_ttl = settings.PARSE_CACHE_TTL
+    parse_cache_db_path = settings.PARSE_CACHE_DB_PATH
+    image_cache_enabled = settings.IMAGE_CACHE_ENABLED
+    image_cache_reuse_probability = settings.IMAGE_CACHE_REUSE_PROBABILITY
+    image_cache_max_variants = settings.IMAGE_CACHE_MAX_VARIANTS
+    image_cache_ttl = settings.IMAGE_CACHE_TTL
+    image_cache_db_path = settings.IMAGE_CACHE_DB_PATH
 except ImportError:
     # Fallback for Vercel environment
     api_key = os.environ.get('OPENAI_API_KEY')
-    meme_storage_path = os.environ.get('MEME_STORAGE_PATH', './meme_images')
+    generation_max_concurrency = int(os.environ.get('GENERATION_MAX_CONCURRENCY', '4'))
+    generation_item_timeout = float(os.environ.get('GENERATION_ITEM_TIMEOUT', '90'))
+    image_response_format = os.environ.get('IMAGE_RESPONSE_FORMAT', 'url')
+    generation_tier = os.environ.get('GENERATION_TIER', 'standard')
+    procedural_fallback = os.environ.get('PROCEDURAL_FALLBACK', 'False').lower() == 'true'
+    openai_chat_rpm = float(os.environ.get('OPENAI_CHAT_RPM', '3500'))
+    openai_chat_concurrency = int(os.environ.get('OPENAI_CHAT_CONCURRENCY', '20'))
+    openai_image_rpm = float(os.environ.get('OPENAI_IMAGE_RPM', '50'))
+    openai_image_concurrency = int(os.environ.get('OPENAI_IMAGE_CONCURRENCY', '8'))
+    openai_max_retries = int(os.environ.get('OPENAI_MAX_RETRIES', '4'))
+    openai_retry_base_delay = float(os.environ.get('OPENAI_RETRY_BASE_DELAY', '0.5'))
+    openai_retry_max_delay = float(os.environ.get('OPENAI_RETRY_MAX_DELAY', '20'))
+    generation_latency_budget = float(os.environ.get('GENERATION_LATENCY_BUDGET', '45'))
+    breaker_failure_threshold = int(os.environ.get('BREAKER_FAILURE_THRESHOLD', '5'))
+    breaker_reset_timeout = float(os.environ.get('BREAKER_RESET_TIMEOUT', '30'))
+    hedge_enabled = os.environ.get('HEDGE_ENABLED', 'False').lower() == 'true'
+    hedge_percentile = float(os.environ.get('HEDGE_PERCENTILE', '0.95'))
+    hedge_max_extra_ratio = float(os.environ.get('HEDGE_MAX_EXTRA_RATIO', '0.1'))
+    warm_pool_enabled = os.environ.get('WARM_POOL_ENABLED', 'False').lower() == 'true'
+    warm_pool_max_themes = int(os.environ.get('WARM_POOL_MAX_THEMES', '20'))
+    warm_pool_stock = int(os.environ.get('WARM_POOL_STOCK', '2'))
+    warm_pool_ttl = float(os.environ.get('WARM_POOL_TTL', '3600'))
+    warm_pool_refill_below = int(os.environ.get('WARM_POOL_REFILL_BELOW', '2'))
+    parse_cache_size = int(os.environ.get('PARSE_CACHE_SIZE', '1024'))
+    parse_cache_ttl = float(os.environ.get('PARSE_CACHE_TTL', '86400'))
+    parse_cache_db_path = os.environ.get('PARSE_CACHE_DB_PATH', '')
+    image_cache_enabled = os.environ.get('IMAGE_CACHE_ENABLED', 'False').lower() == 'true'
+    image_cache_reuse_probability = float(os.environ.get('IMAGE_CACHE_REUSE_PROBABILITY', '0.8'))
+    image_cache_max_variants = int(os.environ.get('IMAGE_CACHE_MAX_VARIANTS', '4'))
+    image_cache_ttl = float(os.environ.get('IMAGE_CACHE_TTL', '604800'))
+    image_cache_db_path = os.environ.get('IMAGE_CACHE_DB_PATH', '')
 
 # Safeguard for missing API key
 if not api_key:
     print("WARNING: OpenAI API key is not set!")
 
-# Check for Vercel Blob token
-BLOB_TOKEN = os.environ.get('BLOB_READ_WRITE_TOKEN')
+# Check that Vercel has somewhere to store images
 IN_VERCEL = os.environ.get('VERCEL') == '1'
 
-if IN_VERCEL and not BLOB_TOKEN:
-    print("WARNING: Running in Vercel but BLOB_READ_WRITE_TOKEN is not set!")
-else:
-    os.environ["BLOB_READ_WRITE_TOKEN"] = BLOB_TOKEN or ""
+if IN_VERCEL and get_storage() is None:
+    print("WARNING: Running in Vercel without storage (set BLOB_READ_WRITE_TOKEN or STORAGE_BACKEND)!")
+
+CHAT_MODEL = "gpt-3.5-turbo"
+IMAGE_MODEL = "dall-e-2"
+IMAGE_SIZE = "1024x1024"
 
-# Initialize OpenAI client
+# Initialize OpenAI clients (sync for scripts, async for the request path).
+# Retries on the async path are handled by `upstream`, so the SDK's own are disabled.
 try:
-    from openai import OpenAI
+    from openai import OpenAI, AsyncOpenAI
     client = OpenAI(api_key=api_key)
+    async_client = AsyncOpenAI(api_key=api_key, max_retries=0)
     print(f"OpenAI client initialized successfully with API key starting with: {api_key[:4] if api_key else 'None'}")
 except Exception as e:
     print(f"Error initializing OpenAI client: {str(e)}")
@@ -49,24 +125,185 @@ except Exception as e:
             return method
     
     client = DummyClient()
+    async_client = DummyClient()
+
+# Shared rate limiting (requests per minute, concurrency) and retry for async OpenAI calls
+upstream = UpstreamClient(
+    {
+        CHAT_MODEL: (openai_chat_rpm, openai_chat_concurrency),
+        IMAGE_MODEL: (openai_image_rpm, openai_image_concurrency),
+    },
+    max_retries=openai_max_retries,
+    base_delay=openai_retry_base_delay,
+    max_delay=openai_retry_max_delay
+)
+
+# One circuit breaker per upstream operation, and the least budget worth starting it with
+breakers = {
+    operation: CircuitBreaker(operation, breaker_failure_threshold, breaker_reset_timeout)
+    for operation in ("parse", "name", "image")
+}
+MIN_BUDGET = {"parse": 1.0, "name": 1.0, "image": 8.0}
+
+# Only the cheap chat operations are hedged; a duplicate image would double the cost
+hedgers = {
+    operation: Hedger(operation, hedge_percentile, hedge_max_extra_ratio)
+    for operation in ("parse", "name")
+} if hedge_enabled else {}
+
+async def call_openai(operation, model, fn, /, **kwargs):
+    """Call OpenAI for an operation ("parse", "name" or "image")
+    
+    Goes through the rate limiter and retries, and raises UpstreamUnavailable
+    right away when the operation's breaker is open or the request's latency
+    budget is too small, so callers can use their local fallback. Parse and
+    name calls are hedged when HEDGE_ENABLED is set.
+    
+    Every call actually sent (including hedges) is metered with its tokens,
+    images, latency and outcome, and attributed to the current usage context.
+    """
+    async def make_call():
+        started = time.monotonic()
+        try:
+            response = await upstream.call(model, fn, **kwargs)
+        except asyncio.CancelledError:
+            meter.record(operation, model, "cancelled", time.monotonic() - started)
+            raise
+        except Exception:
+            meter.record(operation, model, "error", time.monotonic() - started)
+            raise
+        meter.record(operation, model, "ok", time.monotonic() - started, *usage_from_response(response))
+        return response
+    
+    hedger = hedgers.get(operation)
+    try:
+        return await guarded_call(
+            breakers[operation],
+            MIN_BUDGET[operation],
+            (lambda: hedger.call(make_call)) if hedger else make_call
+        )
+    except UpstreamUnavailable:
+        meter.record(operation, model, "rejected", None)
+        raise
+
+def get_upstream_stats():
+    """Return per-model rate limit, retry and latency metrics, breaker states and hedge counters"""
+    return {
+        "models": upstream.stats(),
+        "breakers": {operation: breaker.stats() for operation, breaker in breakers.items()},
+        "hedging": {operation: hedger.stats() for operation, hedger in hedgers.items()}
+    }
+
+# Bounds how many items are generated at once in this process. Created lazily so
+# it binds to the running event loop (required on Python 3.9).
+_generation_semaphore = None
+
+def get_generation_semaphore():
+    """Return the per-process semaphore limiting concurrent item generations"""
+    global _generation_semaphore
+    if _generation_semaphore is None:
+        _generation_semaphore = asyncio.Semaphore(max(1, generation_max_concurrency))
+    return _generation_semaphore
+
+def _create_parse_cache():
+    """Build the parse cache: in-process LRU, plus SQLite if PARSE_CACHE_DB_PATH is set"""
+    disk = None
+    if parse_cache_db_path:
+        try:
+            disk = SQLiteCache(parse_cache_db_path, ttl=parse_cache_ttl, table="parse_cache")
+        except Exception as e:
+            print(f"Error opening parse cache database: {str(e)}")
+    return TieredCache(LRUTTLCache(max_size=parse_cache_size, ttl=parse_cache_ttl), disk)
+
+parse_cache = _create_parse_cache()
+
+def set_parse_cache(cache):
+    """Replace the parse cache (any object with get/set, e.g. a TieredCache), or disable it with None"""
+    global parse_cache
+    parse_cache = cache
+
+def get_parse_cache_stats():
+    """Return hit/miss counters for the parse cache"""
+    if parse_cache is None or not hasattr(parse_cache, "stats"):
+        return {"enabled": parse_cache is not None}
+    return {"enabled": True, **parse_cache.stats()}
+
+def _cached_parse(prompt):
+    """Look up previously parsed items for a prompt"""
+    if parse_cache is None:
+        return None
+    return parse_cache.get(normalize_prompt(prompt))
+
+def _store_parse(prompt, items):
+    """Remember the parsed items for a prompt"""
+    if parse_cache is not None:
+        parse_cache.set(normalize_prompt(prompt), list(items))
+
+async def _cached_parse_async(prompt):
+    """_cached_parse that reads a disk-backed cache off the event loop"""
+    if parse_cache is None:
+        return None
+    if hasattr(parse_cache, "get_async"):
+        return await parse_cache.get_async(normalize_prompt(prompt))
+    return parse_cache.get(normalize_prompt(prompt))
+
+async def _store_parse_async(prompt, items):
+    """_store_parse that writes a disk-backed cache off the event loop"""
+    if parse_cache is None:
+        return
+    if hasattr(parse_cache, "set_async"):
+        await parse_cache.set_async(normalize_prompt(prompt), list(items))
+    else:
+        parse_cache.set(normalize_prompt(prompt), list(items))
+
+def _create_image_cache():
+    """Build the generated-image cache if IMAGE_CACHE_ENABLED is set"""
+    if not image_cache_enabled:
+        return None
+    disk = None
+    if image_cache_db_path:
+        try:
+            disk = SQLiteCache(image_cache_db_path, ttl=image_cache_ttl, table="image_cache")
+        except Exception as e:
+            print(f"Error opening image cache database: {str(e)}")
+    store = TieredCache(LRUTTLCache(max_size=1024, ttl=image_cache_ttl), disk)
+    return ImageCache(
+        store,
+        reuse_probability=image_cache_reuse_probability,
+        max_variants=image_cache_max_variants,
+        ttl=image_cache_ttl
+    )
+
+image_cache = _create_image_cache()
+
+def set_image_cache(cache):
+    """Replace the generated-image cache (an ImageCache), or disable it with None"""
+    global image_cache
+    image_cache = cache
+
+def get_image_cache_stats():
+    """Return reuse counters for the generated-image cache"""
+    if image_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **image_cache.stats()}
+
+# Concurrent identical prompts share one in-flight parse / generation
+parse_flight = SingleFlight("parse")
+generation_flight = SingleFlight("generation")
+
+def get_singleflight_stats():
+    """Return how many parse and generation calls were coalesced"""
+    return {
+        "parse": parse_flight.stats(),
+        "generation": generation_flight.stats()
+    }
 
 def generate_random_name(prefix="MemeSoldier"):
     """Generate a random name for a meme soldier"""
     random_suffix = ''.join(random.choice(string.ascii_lowercase) for _ in range(5))
     return f"{prefix}_{random_suffix}"
 
-def clean_and_parse_prompt(prompt):
-    """Clean and parse the user prompt to identify distinct items for meme generation
-    
-    If multiple items are detected, return the first two. If only one item is found,
-    use creative prompt engineering to derive a second related item.
-    """
-    try:
-        # First try to use GPT to parse and limit the prompt
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": """You are a prompt parser for a meme image generation system. Your task is to identify exactly 2 distinct items from the user's input.
+PARSE_SYSTEM_PROMPT = """You are a prompt parser for a meme image generation system. Your task is to identify exactly 2 distinct items from the user's input.
 
 IMPORTANT RULE: When the user mentions a broad theme or category (e.g., "theme of taiwan food"), don't return the theme itself. Instead, identify 2 specific, concrete examples that represent that theme (e.g., "Bubble tea" and "Taiwanese hot pot").
 
@@ -78,92 +315,116 @@ Examples:
 - Input: "Make memes about cats" → Output: ["Cat knocking things off a table", "Cat sleeping in a weird position"]
 - Input: "Anime character, superhero" → Output: ["Anime character with big eyes", "Muscular superhero in colorful costume"]
 
-Return ONLY a JSON array with exactly 2 strings, nothing else."""},
-                {"role": "user", "content": f"Parse this request and give me exactly 2 distinct items to generate: '{prompt}'"}
-            ],
+Return ONLY a JSON array with exactly 2 strings, nothing else."""
+
+NAME_SYSTEM_PROMPT = "You are a creative meme name generator. Generate a short, catchy, memorable name for a meme character based on the prompt. The name should be 1-3 words only."
+
+def _parse_prompt_messages(prompt):
+    """Build the chat messages used to parse a prompt into 2 items"""
+    return [
+        {"role": "system", "content": PARSE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Parse this request and give me exactly 2 distinct items to generate: '{prompt}'"}
+    ]
+
+def _fallback_parse(prompt):
+    """Split the prompt locally when the model output can't be used"""
+    if ',' in prompt:
+        items = [item.strip() for item in prompt.split(',')]
+        return items[:2] if len(items) >= 2 else [prompt, f"Pixel art variant of {prompt}"]
+    else:
+        return [prompt, f"Pixel art variant of {prompt}"]
+
+def _extract_parsed_items(parsed_text):
+    """Extract the 2 items from the parser model output, or None if it can't be used"""
+    # Try to extract JSON list or fallback to simple parsing
+    try:
+        # Handle various formats the AI might return
+        if parsed_text.startswith('[') and parsed_text.endswith(']'):
+            items = json.loads(parsed_text)
+            if isinstance(items, list) and len(items) >= 2:
+                return items[:2]
+        
+        # If we couldn't parse JSON, use fallback parsing
+        if '1.' in parsed_text and '2.' in parsed_text:
+            lines = [line.strip() for line in parsed_text.split('\n') if line.strip()]
+            items = []
+            for line in lines:
+                if line.startswith('1.') or line.startswith('2.'):
+                    items.append(line.split('.', 1)[1].strip())
+            if len(items) >= 2:
+                return items[:2]
+    except:
+        pass
+    return None
+
+def clean_and_parse_prompt(prompt):
+    """Clean and parse the user prompt to identify distinct items for meme generation
+    
+    If multiple items are detected, return the first two. If only one item is found,
+    use creative prompt engineering to derive a second related item.
+    """
+    cached = _cached_parse(prompt)
+    if cached is not None:
+        return cached
+    
+    try:
+        # First try to use GPT to parse and limit the prompt
+        response = client.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=_parse_prompt_messages(prompt),
             max_tokens=100,
             temperature=0.7
         )
         
         parsed_text = response.choices[0].message.content.strip()
-        
-        # Try to extract JSON list or fallback to simple parsing
-        try:
-            # Handle various formats the AI might return
-            if parsed_text.startswith('[') and parsed_text.endswith(']'):
-                import json
-                items = json.loads(parsed_text)
-                if isinstance(items, list) and len(items) >= 2:
-                    return items[:2]
-            
-            # If we couldn't parse JSON, use fallback parsing
-            if '1.' in parsed_text and '2.' in parsed_text:
-                lines = [line.strip() for line in parsed_text.split('\n') if line.strip()]
-                items = []
-                for line in lines:
-                    if line.startswith('1.') or line.startswith('2.'):
-                        items.append(line.split('.', 1)[1].strip())
-                if len(items) >= 2:
-                    return items[:2]
-        except:
-            pass
-        
-        # If all else fails, do simple fallback parsing
-        if ',' in prompt:
-            items = [item.strip() for item in prompt.split(',')]
-            if len(items) >= 2:
-                return items[:2]
-            else:
-                return [items[0], f"Pixel art {items[0]} in a different style"]
-        else:
-            return [prompt, f"Pixel art variant of {prompt}"]
-        
+        items = _extract_parsed_items(parsed_text)
     except Exception:
-        # Ultimate fallback
-        if ',' in prompt:
-            items = [item.strip() for item in prompt.split(',')]
-            return items[:2] if len(items) >= 2 else [prompt, f"Pixel art variant of {prompt}"]
-        else:
-            return [prompt, f"Pixel art variant of {prompt}"]
+        items = None
+    
+    # Only the model's parse is cached, so a failed call isn't pinned for the TTL
+    if items is None:
+        return _fallback_parse(prompt)
+    _store_parse(prompt, items)
+    return items
 
-async def upload_to_vercel_blob(image_data, filename):
-    """Upload image data to Vercel Blob storage"""
-    try:
-        # Set environment variable
-        os.environ["BLOB_READ_WRITE_TOKEN"] = BLOB_TOKEN
-        
-        # Import the Vercel Blob SDK
-        from vercel_blob import put, PutOptions
-        
-        # Upload to Vercel Blob
-        blob = await put(filename, image_data, PutOptions(access="public"))
-        
-        # Return the URL
-        return {
-            "success": True,
-            "url": blob.url
-        }
-    except Exception as e:
-        print(f"Error uploading to Vercel Blob: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+async def clean_and_parse_prompt_async(prompt):
+    """Async version of clean_and_parse_prompt that doesn't block the event loop
+    
+    Concurrent calls for the same normalized prompt share one model call.
+    """
+    cached = await _cached_parse_async(prompt)
+    if cached is not None:
+        return cached
+    
+    return await parse_flight.do(normalize_prompt(prompt), _parse_prompt_async, prompt)
 
-async def generate_meme_image(prompt):
-    """Generate meme images using OpenAI DALL-E based on parsed prompt"""
+async def _parse_prompt_async(prompt):
+    """Parse a prompt with the model, caching the result"""
     try:
-        # Parse the prompt into 2 distinct items
-        parsed_prompts = clean_and_parse_prompt(prompt)
-        results = []
-        
-        # Check if we're running in Vercel
-        in_vercel = os.environ.get('VERCEL') == '1'
+        response = await call_openai(
+            "parse",
+            CHAT_MODEL,
+            async_client.chat.completions.create,
+            model=CHAT_MODEL,
+            messages=_parse_prompt_messages(prompt),
+            max_tokens=100,
+            temperature=0.7
+        )
         
-        for idx, item_prompt in enumerate(parsed_prompts):
-            try:
-                # Format the prompt to specifically request an icon-style image
-                icon_prompt = f"""Create a simple, clean, pixel art icon of {item_prompt}. 
+        parsed_text = response.choices[0].message.content.strip()
+        items = _extract_parsed_items(parsed_text)
+    except Exception:
+        items = None
+    
+    # Only the model's parse is cached, so a failed call isn't pinned for the TTL
+    if items is None:
+        return _fallback_parse(prompt)
+    await _store_parse_async(prompt, items)
+    return items
+
+def build_icon_prompt(item_prompt):
+    """Format the prompt to specifically request an icon-style image"""
+    return f"""Create a simple, clean, pixel art icon of {item_prompt}. 
 The image should:
 - Be a single object or character with a simple background
 - Have a clean, minimalist design suitable for an icon
@@ -171,75 +432,378 @@ The image should:
 - NOT be a comic panel, scene, or conversational image
 - Centered composition with the subject taking up most of the frame
 - Be suitable for use as a game character icon or token"""
-                
-                # Generate image with DALL-E
-                response = client.images.generate(
-                    model="dall-e-2",
-                    prompt=icon_prompt,
-                    size="1024x1024",
-                    quality="standard",
-                    n=1,
-                )
-                
-                # Get the image URL
-                image_url = response.data[0].url
-                file_name = f"{int(time.time())}_{idx}_{generate_random_name()}.png"
-                
-                if in_vercel:
-                    # In Vercel environment, use Blob storage if possible
-                    if BLOB_TOKEN:
-                        try:
-                            # Download the image from DALL-E
-                            image_response = requests.get(image_url)
-                            if image_response.status_code == 200:
-                                # Upload to Vercel Blob
-                                blob_result = await upload_to_vercel_blob(image_response.content, file_name)
-                                if blob_result["success"]:
-                                    # We have successfully uploaded to Blob storage
-                                    results.append({
-                                        "prompt": item_prompt,
-                                        "image_path": "vercel_blob",
-                                        "image_url": blob_result["url"],
-                                        "coin_icon_url": blob_result["url"]  # For now, use same URL
-                                    })
-                                    continue
-                        except Exception as blob_error:
-                            print(f"Error using Blob storage: {str(blob_error)}")
-                            # Fallback to using DALL-E URL directly
-                    
-                    # Fallback: use DALL-E URL directly
-                    results.append({
-                        "prompt": item_prompt,
-                        "image_path": "dalle_direct",
-                        "image_url": image_url,  # Use the DALL-E URL directly
-                        "coin_icon_url": image_url  # Use the same URL for coin icon
-                    })
-                else:
-                    # For local development, save to filesystem
-                    image_response = requests.get(image_url)
-                    if image_response.status_code != 200:
-                        continue
-                    
-                    # Save the image
-                    os.makedirs(meme_storage_path, exist_ok=True)
-                    file_path = os.path.join(meme_storage_path, file_name)
-                    
-                    with open(file_path, "wb") as f:
-                        f.write(image_response.content)
-                    
-                    # Create a coin icon (simplified version of the image)
-                    create_coin_icon(image_response.content, file_name)
-                    
-                    results.append({
-                        "prompt": item_prompt,
-                        "image_path": file_path,
-                        "image_url": f"/images/{file_name}",
-                        "coin_icon_url": f"/images/coin_{file_name}"
-                    })
-            except Exception as item_error:
-                print(f"Error generating item {idx}: {str(item_error)}")
-                # Continue with next item
-                continue
+
+async def _generate_item_image(idx, item_prompt, provider):
+    """Generate, download and store the image for a single parsed item
+    
+    Returns the item dict, or None if the item could not be generated.
+    """
+    icon_prompt = build_icon_prompt(item_prompt)
+    
+    # Reuse a previously generated image for the exact same icon prompt if allowed
+    cache_key = image_cache_key(IMAGE_MODEL, IMAGE_SIZE, icon_prompt)
+    if image_cache is not None and provider.cacheable:
+        cached = await image_cache.choose(cache_key)
+        if cached is not None:
+            return {
+                "prompt": item_prompt,
+                "image_path": cached["image_path"],
+                "image_url": cached["image_url"],
+                "coin_icon_url": cached["coin_icon_url"],
+                "coin_icon_variants": cached.get("coin_icon_variants"),
+                "provider": provider.name
+            }
+    
+    item = await _create_item_image(idx, item_prompt, icon_prompt, provider)
+    
+    # DALL-E URLs expire, so only images we stored ourselves are worth caching.
+    # Pixel art fallbacks are not cached under the DALL-E key.
+    if (item is not None and image_cache is not None and item["image_path"] != "dalle_direct"
+            and image_providers[item["provider"]].cacheable):
+        await image_cache.add(cache_key, {
+            "image_path": item["image_path"],
+            "image_url": item["image_url"],
+            "coin_icon_url": item["coin_icon_url"],
+            "coin_icon_variants": item["coin_icon_variants"]
+        })
+    return item
+
+def get_image_response_format():
+    """Return the DALL-E response format to request ("url" or "b64_json")
+    
+    b64_json returns the image in the API response so it doesn't have to be
+    downloaded again. It needs somewhere to store the bytes, so without a
+    storage backend the URL format is always used.
+    """
+    if image_response_format == "b64_json" and get_storage() is not None:
+        return "b64_json"
+    return "url"
+
+async def request_image(icon_prompt, response_format="url"):
+    """Call DALL-E, returning (image_url, image_data); only one of them is set"""
+    response = await call_openai(
+        "image",
+        IMAGE_MODEL,
+        async_client.images.generate,
+        model=IMAGE_MODEL,
+        prompt=icon_prompt,
+        size=IMAGE_SIZE,
+        quality="standard",
+        n=1,
+        response_format=response_format,
+    )
+    
+    if response_format == "b64_json":
+        return None, base64.b64decode(response.data[0].b64_json)
+    return response.data[0].url, None
+
+class OpenAIImageProvider:
+    """Images from DALL-E (the "standard" tier)"""
+    name = "openai"
+    cacheable = True
+    compactable = True
+    
+    async def generate(self, item_prompt, icon_prompt):
+        return await request_image(icon_prompt, get_image_response_format())
+
+class PixelArtProvider:
+    """Procedural pixel art rendered locally (the "fast" tier)
+    
+    Seeded from the item prompt, so the same item always gets the same sprite.
+    No network calls, which also makes it usable offline and for load tests.
+    """
+    name = "pixel"
+    cacheable = False
+    # Sprites are already palette-limited and grid-aligned
+    compactable = False
+    
+    async def generate(self, item_prompt, icon_prompt):
+        return None, await run_image_task(render_sprite, item_prompt)
+
+image_providers = {
+    "openai": OpenAIImageProvider(),
+    "pixel": PixelArtProvider()
+}
+
+# Image provider used by each generation tier
+TIER_PROVIDERS = {
+    "standard": "openai",
+    "fast": "pixel"
+}
+
+def get_image_provider(tier=None):
+    """Return the image provider for a tier ("standard" or "fast"), defaulting to GENERATION_TIER"""
+    tier = tier or generation_tier
+    if tier not in TIER_PROVIDERS:
+        raise ValueError(f"Unknown generation tier: {tier}")
+    return image_providers[TIER_PROVIDERS[tier]]
+
+async def _request_item_image(idx, item_prompt, icon_prompt, provider):
+    """Get (image_url, image_data) from provider, falling back to pixel art
+    
+    Returns the provider that actually produced the image along with it.
+    """
+    try:
+        image_url, image_data = await provider.generate(item_prompt, icon_prompt)
+        return provider, image_url, image_data
+    except Exception as e:
+        # Also covers UpstreamUnavailable (breaker open or latency budget spent)
+        if not procedural_fallback or provider is image_providers["pixel"]:
+            raise
+        print(f"Image provider {provider.name} failed for item {idx}, using pixel art: {str(e)}")
+    
+    provider = image_providers["pixel"]
+    image_url, image_data = await provider.generate(item_prompt, icon_prompt)
+    return provider, image_url, image_data
+
+async def _create_item_image(idx, item_prompt, icon_prompt, provider):
+    """Generate an image with provider and store it, returning the item dict or None"""
+    provider, image_url, image_data = await _request_item_image(
+        idx, item_prompt, icon_prompt, provider
+    )
+    storage = get_storage()
+    if storage is not None:
+        try:
+            return await _store_item_image(storage, idx, item_prompt, image_url, image_data, provider)
+        except Exception as storage_error:
+            print(f"Error using {storage.name} storage: {str(storage_error)}")
+            # Fallback to using DALL-E URL directly
+    
+    # Pixel art sprites are a few KB, so they can be served inline
+    if image_url is None and provider is image_providers["pixel"]:
+        data_url = f"data:image/png;base64,{base64.b64encode(image_data).decode('ascii')}"
+        return {
+            "prompt": item_prompt,
+            "image_path": "inline",
+            "image_url": data_url,
+            "coin_icon_url": data_url,
+            "coin_icon_variants": None,
+            "provider": provider.name
+        }
+    
+    # There is no DALL-E URL to fall back to in b64_json mode
+    if image_url is None:
+        return None
+    
+    # Fallback: use DALL-E URL directly
+    return {
+        "prompt": item_prompt,
+        "image_path": "dalle_direct",
+        "image_url": image_url,  # Use the DALL-E URL directly
+        "coin_icon_url": image_url,  # Use the same URL for coin icon
+        "coin_icon_variants": None,
+        "provider": provider.name
+    }
+
+async def _store_item_image(storage, idx, item_prompt, image_url, image_data, provider):
+    """Put the image and its coin icons in storage, returning the item dict or None
+    
+    Images are stored under content-hash names, so their URLs are immutable.
+    With local storage, image URLs are streamed to disk rather than buffered in
+    memory. With IMAGE_COMPACTION, pixel art is stored as a grid-snapped,
+    palette-limited lossless WebP (a few KB instead of ~1 MB), and the original
+    PNG is kept under originals/ only if IMAGE_KEEP_ORIGINAL is set.
+    """
+    local = isinstance(storage, LocalStorage)
+    
+    download_name = None
+    if image_data is None and local:
+        # Stream the image straight to disk; it is compacted from (or moved from) there
+        download_name = f"{int(time.time())}_{idx}_{generate_random_name()}.png"
+        if await download_to_file(image_url, storage.local_path(download_name)) is None:
+            return None
+    elif image_data is None:
+        image_data = await download_bytes(image_url)
+        if image_data is None:
+            return None
+    source = storage.local_path(download_name) if download_name else image_data
+    
+    compacted = None
+    if image_compaction and provider.compactable:
+        try:
+            compacted = await run_image_task(compact_pixel_art, source, image_palette_colors)
+        except Exception as e:
+            print(f"Error compacting image: {str(e)}")
+    
+    if download_name is not None and compacted is None:
+        # Keep the downloaded PNG, moved to its content-hash name
+        stored_name = await storage.adopt(download_name, ".png")
+        stored_url = storage.url(stored_name)
+        coin_icon_variants = await create_coin_icons(storage.local_path(stored_name), stored_name)
+    else:
+        stored_data, extension, content_type = image_data, ".png", "image/png"
+        uploads = []
+        if compacted is not None:
+            stored_data, extension, content_type = compacted, ".webp", "image/webp"
+            if image_keep_original and download_name is not None:
+                uploads.append(storage.adopt(download_name, ".png", "originals/"))
+            elif image_keep_original:
+                uploads.append(storage.put(content_key(image_data, ".png", "originals/"), image_data))
+            elif download_name is not None:
+                os.remove(storage.local_path(download_name))
+        stored_name = content_key(stored_data, extension)
+        
+        # Store the image while the coin icons are rendered and stored
+        coin_icon_variants, stored_url, *_ = await asyncio.gather(
+            create_coin_icons(stored_data, f"{os.path.splitext(stored_name)[0]}.png"),
+            storage.put(stored_name, stored_data, content_type),
+            *uploads
+        )
+    
+    return {
+        "prompt": item_prompt,
+        "image_path": storage.local_path(stored_name) if local else storage.name,
+        "image_url": stored_url,
+        "coin_icon_url": coin_icon_variants.get(str(DEFAULT_COIN_ICON_SIZE), stored_url),
+        "coin_icon_variants": coin_icon_variants or None,
+        "provider": provider.name
+    }
+
+async def _generate_item(idx, item_prompt, provider):
+    """Generate one item under the concurrency limit and per-item timeout"""
+    try:
+        # Local rendering is bounded by the image worker pool, and shouldn't queue behind DALL-E
+        if provider is image_providers["pixel"]:
+            return await _generate_item_image(idx, item_prompt, provider)
+        async with get_generation_semaphore():
+            return await asyncio.wait_for(
+                _generate_item_image(idx, item_prompt, provider),
+                timeout=generation_item_timeout
+            )
+    except asyncio.TimeoutError:
+        # The request's latency budget also cuts calls off with a TimeoutError
+        if remaining_budget() == 0:
+            print(f"Error generating item {idx}: latency budget ran out")
+        else:
+            print(f"Error generating item {idx}: timed out after {generation_item_timeout}s")
+    except Exception as item_error:
+        print(f"Error generating item {idx}: {str(item_error)}")
+    return None
+
+async def generate_meme_image(prompt, include_names=False, budget=None, tier=None):
+    """Generate meme images using OpenAI DALL-E based on parsed prompt
+    
+    Items are generated concurrently. If include_names is True, all items are
+    named with one batched completion that runs in parallel with the images,
+    and each item gets a "name". Concurrent requests for the same normalized
+    prompt share a single generation and all receive its result.
+    
+    budget is a latency budget in seconds: upstream calls that can't finish in
+    the remaining time are skipped in favour of the local fallbacks.
+    
+    tier is "standard" (OpenAI) or "fast" (procedural pixel art, parsing and
+    names done locally with no network calls); defaults to GENERATION_TIER.
+    """
+    global active_generations
+    
+    tier = tier or generation_tier
+    if tier == "fast":
+        return await _generate_meme_image(prompt, include_names, tier)
+    
+    # Serve a pre-generated result for a trending prompt if one is in stock
+    if warm_pool is not None and include_names:
+        pooled = warm_pool.take(prompt)
+        if pooled is not None:
+            warm_pool.record(prompt, [item["prompt"] for item in pooled["items"]])
+            return pooled
+    
+    key = (normalize_prompt(prompt), include_names)
+    active_generations += 1
+    try:
+        if budget is None:
+            result = await generation_flight.do(key, _generate_meme_image, prompt, include_names, tier)
+        else:
+            with latency_budget(budget):
+                result = await generation_flight.do(key, _generate_meme_image, prompt, include_names, tier)
+    finally:
+        active_generations -= 1
+    
+    if warm_pool is not None:
+        warm_pool.record(prompt, [item["prompt"] for item in result.get("items", [])])
+    return result
+
+# Requests currently generating; the warm pool only refills below WARM_POOL_REFILL_BELOW
+active_generations = 0
+
+async def _generate_for_warm_pool(prompt):
+    with usage_context("warm_pool"):
+        return await _generate_meme_image(prompt, True, "standard")
+
+def _stored_keys(item):
+    """Storage keys of the image and coin icons stored for a generated item"""
+    urls = [item.get("image_url")] + list((item.get("coin_icon_variants") or {}).values())
+    keys = {unquote(urlsplit(url).path.rsplit("/", 1)[-1]) for url in urls if url and not url.startswith("data:")}
+    return [key for key in keys if is_content_key(key)]
+
+async def _discard_warm_pool_result(result):
+    """Delete the stored images of warm pool stock that expired without being served
+    
+    Only DALL-E images are deleted: they belong to this result alone, while pixel
+    art is content-addressed by prompt and may be shared with saved soldiers.
+    With the image cache enabled they are kept, as the cache reuses them.
+    """
+    storage = get_storage()
+    if storage is None or image_cache is not None:
+        return
+    keys = [
+        key for item in result.get("items", []) if item.get("provider") == "openai"
+        for key in _stored_keys(item)
+    ]
+    await asyncio.gather(*[storage.delete(key) for key in keys])
+
+def _create_warm_pool():
+    """Build the warm pool if WARM_POOL_ENABLED is set (it is started with the app)"""
+    if not warm_pool_enabled:
+        return None
+    return WarmPool(
+        generate=_generate_for_warm_pool,
+        can_refill=lambda: active_generations < warm_pool_refill_below,
+        max_themes=warm_pool_max_themes,
+        stock_per_theme=warm_pool_stock,
+        ttl=warm_pool_ttl,
+        discard=_discard_warm_pool_result
+    )
+
+warm_pool = _create_warm_pool()
+
+def get_warm_pool_stats():
+    """Return hit rate, stock and trending themes of the warm pool"""
+    if warm_pool is None:
+        return {"enabled": False}
+    return {"enabled": True, **warm_pool.stats()}
+
+async def _parse_for_tier(prompt, tier):
+    """Parse the prompt into items; the fast tier splits it locally"""
+    if tier == "fast":
+        return _fallback_parse(prompt)
+    return await clean_and_parse_prompt_async(prompt)
+
+async def _names_for_tier(prompts, tier):
+    """Name the items; the fast tier uses deterministic local names"""
+    if tier == "fast":
+        return [sprite_name(prompt) for prompt in prompts]
+    return await generate_meme_soldier_names(prompts)
+
+async def _generate_meme_image(prompt, include_names, tier):
+    """Run the parse / image / name pipeline for one prompt"""
+    try:
+        provider = get_image_provider(tier)
+        
+        # Parse the prompt into 2 distinct items
+        parsed_prompts = await _parse_for_tier(prompt, tier)
+        
+        images = asyncio.gather(*[
+            _generate_item(idx, item_prompt, provider)
+            for idx, item_prompt in enumerate(parsed_prompts)
+        ])
+        if include_names:
+            generated, names = await asyncio.gather(images, _names_for_tier(parsed_prompts, tier))
+            for item, name in zip(generated, names):
+                if item is not None:
+                    item["name"] = name
+        else:
+            generated = await images
+        results = [item for item in generated if item is not None]
         
         # If we didn't generate any items successfully, return an error
         if not results:
@@ -259,56 +823,148 @@ The image should:
             "error": str(e)
         }
 
-def create_coin_icon(image_data, original_filename):
-    """Create a circular coin icon from the meme image"""
-    # Skip in Vercel environment
-    if IN_VERCEL:
-        return False
-        
+async def generate_meme_image_events(prompt, tier=None):
+    """Run the generation pipeline, yielding an event as each stage completes
+    
+    Yields {"event": "parsed", "prompts": [...]} first, then for each item as soon
+    as its image and name are ready {"event": "item", "index": i, "item": {...}}
+    (or {"event": "item_error", ...} if it failed), then a final
+    {"event": "done", "success": ..., "count": ...} summary.
+    """
+    tier = tier or generation_tier
+    provider = get_image_provider(tier)
+    parsed_prompts = await _parse_for_tier(prompt, tier)
+    yield {"event": "parsed", "prompts": parsed_prompts}
+    
+    count = 0
+    
+    async def indexed_item(idx, item_prompt):
+        return idx, await _generate_item(idx, item_prompt, provider)
+    
+    names_task = asyncio.ensure_future(_names_for_tier(parsed_prompts, tier))
+    tasks = [
+        asyncio.ensure_future(indexed_item(idx, item_prompt))
+        for idx, item_prompt in enumerate(parsed_prompts)
+    ]
     try:
-        # Open the image
-        img = Image.open(BytesIO(image_data))
-        
-        # Create a square crop
-        width, height = img.size
-        size = min(width, height)
-        left = (width - size) // 2
-        top = (height - size) // 2
-        right = left + size
-        bottom = top + size
-        img = img.crop((left, top, right, bottom))
-        
-        # Resize to coin size
-        img = img.resize((256, 256))
-        
-        # Save the coin icon
-        coin_filename = f"coin_{original_filename}"
-        coin_path = os.path.join(meme_storage_path, coin_filename)
-        img.save(coin_path)
+        for next_done in asyncio.as_completed(tasks):
+            idx, item = await next_done
+            if item is None:
+                yield {"event": "item_error", "index": idx, "prompt": parsed_prompts[idx]}
+                continue
+            item["name"] = (await names_task)[idx]
+            count += 1
+            yield {"event": "item", "index": idx, "item": item}
+    finally:
+        # Stop outstanding work if the consumer went away early
+        for task in tasks + [names_task]:
+            task.cancel()
+    
+    yield {
+        "event": "done",
+        "success": count > 0,
+        "count": count,
+        "error": None if count else "Failed to generate any images"
+    }
+
+async def create_coin_icons(image_data, original_filename):
+    """Create square coin icons in every configured size from the meme image
+    
+    image_data is either the image bytes or the path of the saved image. The
+    rendering runs in the image worker pool and the icons are stored
+    concurrently. Returns {size: URL} (size as a string), or an empty dict if
+    the icons could not be created.
+    """
+    storage = get_storage()
+    if storage is None:
+        return {}
         
-        return True
-    except Exception:
-        return False
+    try:
+        icons = await run_image_task(render_coin_icons, image_data, original_filename, coin_icon_sizes)
+        urls = await asyncio.gather(*[
+            storage.put(filename, data) for filename, data in icons.values()
+        ])
+        return {str(size): url for size, url in zip(icons, urls)}
+    except Exception as e:
+        print(f"Error creating coin icons: {str(e)}")
+        return {}
+
+def _name_messages(prompt):
+    """Build the chat messages used to name a single meme soldier"""
+    return [
+        {"role": "system", "content": NAME_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Generate a catchy meme soldier name based on this description: {prompt}"}
+    ]
+
+def _clean_name(name):
+    """Remove quotes from a generated name, falling back to a random one"""
+    name = name.strip().strip('"\'')
+    return name if name else generate_random_name()
 
 def generate_meme_soldier_name(prompt):
     """Generate a creative name for a meme soldier based on the prompt"""
     try:
         response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a creative meme name generator. Generate a short, catchy, memorable name for a meme character based on the prompt. The name should be 1-3 words only."},
-                {"role": "user", "content": f"Generate a catchy meme soldier name based on this description: {prompt}"}
-            ],
+            model=CHAT_MODEL,
+            messages=_name_messages(prompt),
             max_tokens=20
         )
         
-        name = response.choices[0].message.content.strip()
-        # Remove quotes if present
-        name = name.strip('"\'')
-        
-        return name if name else generate_random_name()
+        return _clean_name(response.choices[0].message.content)
     except Exception:
         # Fallback to random name
-        return generate_random_name() 
+        return generate_random_name()
+
+def _names_messages(prompts):
+    """Build the chat messages used to name several meme soldiers in one completion"""
+    return [
+        {"role": "system", "content": NAME_SYSTEM_PROMPT + ' You will be given a JSON array of descriptions. Return a JSON object of the form {"names": [...]} with exactly one name per description, in the same order.'},
+        {"role": "user", "content": f"Generate catchy meme soldier names based on these descriptions:\n{json.dumps(list(prompts), ensure_ascii=False)}"}
+    ]
 
+def _validate_names(parsed_text, count):
+    """Return the names from a batched completion, using None for any that are unusable"""
+    try:
+        data = json.loads(parsed_text)
+    except ValueError:
+        return [None] * count
+    names = data.get("names") if isinstance(data, dict) else data
+    if not isinstance(names, list):
+        return [None] * count
+    
+    validated = []
+    for idx in range(count):
+        name = names[idx] if idx < len(names) else None
+        if isinstance(name, str):
+            name = name.strip().strip('"\'').strip()
+        validated.append(name if isinstance(name, str) and 0 < len(name) <= 50 else None)
+    return validated
 
+async def generate_meme_soldier_names(prompts):
+    """Generate names for several meme soldiers with a single structured-JSON completion
+    
+    Any name that is missing or invalid falls back to generate_random_name.
+    """
+    prompts = list(prompts)
+    if not prompts:
+        return []
+    
+    try:
+        response = await asyncio.wait_for(
+            call_openai(
+                "name",
+                CHAT_MODEL,
+                async_client.chat.completions.create,
+                model=CHAT_MODEL,
+                messages=_names_messages(prompts),
+                response_format={"type": "json_object"},
+                max_tokens=20 * len(prompts) + 20
+            ),
+            timeout=generation_item_timeout
+        )
+        names = _validate_names(response.choices[0].message.content, len(prompts))
+    except Exception as e:
+        print(f"Error generating names: {str(e)}")
+        names = [None] * len(prompts)
+    
+    return [name or generate_random_name() for name in names]
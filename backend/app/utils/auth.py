@@ -3,7 +3,8 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status, Query
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from eth_account.messages import encode_defunct
 from web3 import Web3
 import secrets
@@ -45,7 +46,7 @@ def verify_signature(wallet_address: str, signature: str, message: str) -> bool:
 
 async def get_current_user(
     token: Optional[str] = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     test_mode: bool = Query(False, description="Set to true to bypass authentication for testing")
 ):
     """Get the current authenticated user or None in test mode
@@ -79,7 +80,7 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.wallet_address == token_data.wallet_address).first()
+    user = await db.scalar(select(User).where(User.wallet_address == token_data.wallet_address))
     if user is None:
         raise credentials_exception
     return user 
\ No newline at end of file
@@ -0,0 +1,337 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_prompt(prompt):
+    """Normalize a prompt so trivially different spellings share a cache key"""
+    text = re.sub(r"\s+", " ", (prompt or "").strip().lower())
+    return text.strip(" .!?;:'\"")
+
+class LRUTTLCache:
+    """In-process LRU cache whose entries expire after a TTL (seconds)"""
+
+    def __init__(self, max_size=1024, ttl=86400):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + (ttl if ttl is not None else self.ttl))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+class SQLiteCache:
+    """On-disk cache tier backed by SQLite so entries survive restarts
+
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, path, ttl=86400, table="cache"):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < time.time():
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+class TieredCache:
+    """Memory cache in front of an optional disk cache, with hit/miss counters
+
+    Disk hits are promoted into the memory tier. get_async/set_async do the
+    same as get/set, but run the blocking disk tier calls in the default
+    executor; use them on the event loop.
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _get_memory(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def _get_disk(self, key):
+        try:
+            value = self.disk.get(key)
+        except Exception as e:
+            print(f"Error reading disk cache: {str(e)}")
+            value = None
+        if value is not None:
+            self.hits += 1
+            self.disk_hits += 1
+            self.memory.set(key, value)
+        return value
+
+    def _set_disk(self, key, value):
+        try:
+            self.disk.set(key, value)
+        except Exception as e:
+            print(f"Error writing disk cache: {str(e)}")
+
+    def get(self, key):
+        value = self._get_memory(key)
+        if value is None and self.disk is not None:
+            value = self._get_disk(key)
+        if value is None:
+            self.misses += 1
+        return value
+
+    async def get_async(self, key):
+        value = self._get_memory(key)
+        if value is None and self.disk is not None:
+            value = await asyncio.get_running_loop().run_in_executor(None, self._get_disk, key)
+        if value is None:
+            self.misses += 1
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self._set_disk(key, value)
+
+    async def set_async(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._set_disk, key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.memory),
+            "disk_enabled": self.disk is not None
+        }
+
+def image_cache_key(model, size, icon_prompt):
+    """Content address for a generated image: hash of everything sent to the image model"""
+    payload = json.dumps([model, size, icon_prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ImageCache:
+    """Stores previously generated images (their stored URLs) per content address
+
+    Up to max_variants images are kept for each key. On lookup a stored variant
+    is reused with probability reuse_probability; otherwise the caller generates
+    a fresh image and adds it as another variant, so popular items stay varied.
+    choose and add are coroutines, so a disk-backed store is read off the event loop.
+    """
+
+    def __init__(self, store, reuse_probability=0.8, max_variants=4, ttl=604800):
+        self.store = store
+        self.reuse_probability = reuse_probability
+        self.max_variants = max_variants
+        self.ttl = ttl
+        self.reused = 0
+        self.refreshed = 0
+
+    async def _store_get(self, key):
+        if hasattr(self.store, "get_async"):
+            return await self.store.get_async(key)
+        return self.store.get(key)
+
+    async def _store_set(self, key, value):
+        if hasattr(self.store, "set_async"):
+            await self.store.set_async(key, value)
+        else:
+            self.store.set(key, value)
+
+    async def _variants(self, key):
+        variants = await self._store_get(key) or []
+        now = time.time()
+        return [v for v in variants if v.get("created_at", 0) + self.ttl >= now]
+
+    async def choose(self, key):
+        """Return a stored variant to reuse, or None if a fresh image should be generated"""
+        variants = await self._variants(key)
+        if not variants:
+            return None
+        # Once the key has a full set of variants, always reuse one of them
+        if len(variants) < self.max_variants and random.random() >= self.reuse_probability:
+            self.refreshed += 1
+            return None
+        self.reused += 1
+        return dict(random.choice(variants))
+
+    async def add(self, key, variant):
+        """Record a freshly generated image for the key, evicting the oldest variant"""
+        variants = await self._variants(key)
+        variants.append({**variant, "created_at": time.time()})
+        await self._store_set(key, variants[-self.max_variants:])
+
+    def stats(self):
+        stats = self.store.stats() if hasattr(self.store, "stats") else {}
+        return {**stats, "reused": self.reused, "refreshed": self.refreshed}
+
+class DiskLRUCache:
+    """Files in a directory, evicting the least recently used once over max_bytes
+
+    Recency is tracked in memory and persisted through file mtimes, so the
+    order survives restarts. Keys must be safe file names.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    def path(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Return the path of the cached file for key, or None"""
+        with self._lock:
+            if key in self._entries and os.path.exists(self.path(key)):
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self._drop(key)
+                self.misses += 1
+                return None
+        try:
+            os.utime(self.path(key))
+        except OSError:
+            pass
+        return self.path(key)
+
+    def put(self, key, data):
+        """Store data under key, returning its path"""
+        path = self.path(key)
+        tmp_path = f"{path}.{random.getrandbits(64):x}.part"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = len(data)
+            self.total_bytes += len(data)
+            self._evict()
+        return path
+
+    def _drop(self, key):
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions
+        }
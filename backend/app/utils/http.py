@@ -0,0 +1,111 @@
+import asyncio
+import os
+import uuid
+
+import httpx
+
+# HTTP client settings with fallback to environment variables
+try:
+    from app.config.settings import settings
+    http_max_connections = settings.HTTP_MAX_CONNECTIONS
+    http_max_keepalive = settings.HTTP_MAX_KEEPALIVE
+    http_timeout = settings.HTTP_TIMEOUT
+    download_chunk_size = settings.HTTP_DOWNLOAD_CHUNK_SIZE
+except ImportError:
+    # Fallback for Vercel environment
+    http_max_connections = int(os.environ.get('HTTP_MAX_CONNECTIONS', '100'))
+    http_max_keepalive = int(os.environ.get('HTTP_MAX_KEEPALIVE', '20'))
+    http_timeout = float(os.environ.get('HTTP_TIMEOUT', '60'))
+    download_chunk_size = int(os.environ.get('HTTP_DOWNLOAD_CHUNK_SIZE', '65536'))
+
+_http_client = None
+_http_client_loop = None
+
+def get_http_client():
+    """Return the shared pooled AsyncClient for the running event loop
+
+    Connections are kept alive and reused across requests. A new client is
+    created if the event loop changed (e.g. a Celery worker or test run).
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            timeout=http_timeout,
+            limits=httpx.Limits(
+                max_connections=http_max_connections,
+                max_keepalive_connections=http_max_keepalive
+            )
+        )
+        _http_client_loop = loop
+    return _http_client
+
+def set_http_client(client):
+    """Replace the shared client (e.g. one with a mock transport for tests)"""
+    global _http_client, _http_client_loop
+    _http_client = client
+    _http_client_loop = asyncio.get_running_loop() if client is not None else None
+
+async def close_http_client():
+    """Close the shared client, releasing its pooled connections"""
+    global _http_client, _http_client_loop
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+
+def _sync_and_replace(f, tmp_path, path):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.replace(tmp_path, path)
+
+async def download_to_file(url, path):
+    """Stream url to path in chunks, fsync it and move it into place atomically
+
+    Returns the number of bytes written, or None if the response was not 200.
+    The file is opened, written and synced in the default executor, so a slow
+    disk never blocks the event loop.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    client = get_http_client()
+    loop = asyncio.get_running_loop()
+    async with client.stream("GET", url) as response:
+        if response.status_code != 200:
+            return None
+        size = 0
+        f = await loop.run_in_executor(None, open, tmp_path, "wb")
+        try:
+            async for chunk in response.aiter_bytes(download_chunk_size):
+                await loop.run_in_executor(None, f.write, chunk)
+                size += len(chunk)
+            await loop.run_in_executor(None, _sync_and_replace, f, tmp_path, path)
+        except BaseException:
+            f.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return size
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+    f = open(tmp_path, "wb")
+    try:
+        f.write(data)
+        _sync_and_replace(f, tmp_path, path)
+    except BaseException:
+        f.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+async def write_file_atomic(path, data):
+    """Write data to path (fsync + atomic rename) without blocking the event loop"""
+    await asyncio.get_running_loop().run_in_executor(None, _write_atomic, path, data)
+
+async def download_bytes(url):
+    """Download url into memory using the shared client, or return None if not 200"""
+    response = await get_http_client().get(url)
+    if response.status_code != 200:
+        return None
+    return response.content
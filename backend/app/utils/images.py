@@ -0,0 +1,212 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Image pool settings with fallback to environment variables
+try:
+    from app.config.settings import settings
+    image_pool_kind = settings.IMAGE_POOL_KIND
+    image_pool_workers = settings.IMAGE_POOL_WORKERS
+    coin_icon_sizes = settings.COIN_ICON_SIZES
+    image_compaction = settings.IMAGE_COMPACTION
+    image_palette_colors = settings.IMAGE_PALETTE_COLORS
+    image_keep_original = settings.IMAGE_KEEP_ORIGINAL
+except ImportError:
+    # Fallback for Vercel environment
+    image_pool_kind = os.environ.get('IMAGE_POOL_KIND', 'thread')
+    image_pool_workers = int(os.environ.get('IMAGE_POOL_WORKERS', '2'))
+    coin_icon_sizes = os.environ.get('COIN_ICON_SIZES', '32,64,128,256')
+    image_compaction = os.environ.get('IMAGE_COMPACTION', 'False').lower() == 'true'
+    image_palette_colors = int(os.environ.get('IMAGE_PALETTE_COLORS', '16'))
+    image_keep_original = os.environ.get('IMAGE_KEEP_ORIGINAL', 'False').lower() == 'true'
+
+# The 256px icon keeps the original coin_ file name so existing URLs stay valid
+DEFAULT_COIN_ICON_SIZE = 256
+
+def parse_sizes(sizes):
+    """Parse a comma separated size list into sorted unique ints, largest first"""
+    if isinstance(sizes, str):
+        sizes = [size for size in sizes.split(",") if size.strip()]
+    return sorted({int(size) for size in sizes}, reverse=True)
+
+def coin_icon_filename(original_filename, size):
+    """File name of the coin icon of the given size"""
+    if size == DEFAULT_COIN_ICON_SIZE:
+        return f"coin_{original_filename}"
+    return f"coin_{size}_{original_filename}"
+
+def render_coin_icons(source, original_filename, sizes):
+    """Decode an image once and encode a square PNG coin icon for each size
+
+    source is a file path or the image bytes. Each smaller icon is derived from the
+    previous one, using Image.reduce when the ratio is a whole number. Runs in a
+    worker pool, so it must stay a plain picklable function.
+
+    Returns {size: (file name, PNG bytes)}; storing them is up to the caller.
+    """
+    from io import BytesIO
+    from PIL import Image
+
+    sizes = parse_sizes(sizes)
+    img = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    # Let JPEG sources decode straight at a reduced scale (no-op for PNG)
+    img.draft("RGB", (sizes[0], sizes[0]))
+
+    # Create a square crop
+    width, height = img.size
+    size = min(width, height)
+    left = (width - size) // 2
+    top = (height - size) // 2
+    img = img.crop((left, top, left + size, top + size))
+    # Palette images (e.g. pixel art sprites) can't be resampled directly
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+
+    icons = {}
+    for target in sizes:
+        current = img.size[0]
+        if current != target:
+            if current % target == 0:
+                img = img.reduce(current // target)
+            else:
+                img = img.resize((target, target), Image.LANCZOS)
+        buffer = BytesIO()
+        img.save(buffer, format="PNG")
+        icons[target] = (coin_icon_filename(original_filename, target), buffer.getvalue())
+    return icons
+
+def _edge_profile(img, axis):
+    """Mean colour change between each pair of neighbouring columns (axis 0) or rows (axis 1)"""
+    from PIL import Image, ImageChops
+
+    width, height = img.size
+    if axis == 0:
+        diff = ImageChops.difference(img.crop((1, 0, width, height)), img.crop((0, 0, width - 1, height)))
+        return list(diff.convert("L").resize((width - 1, 1), Image.BOX).getdata())
+    diff = ImageChops.difference(img.crop((0, 1, width, height)), img.crop((0, 0, width, height - 1)))
+    return list(diff.convert("L").resize((1, height - 1), Image.BOX).getdata())
+
+def _grid_period(profile, max_cell, threshold):
+    """Largest cell size whose boundaries carry at least threshold of the edge energy
+
+    Returns (cell, offset), or (1, 0) if there is no such grid.
+    """
+    total = sum(profile)
+    if total == 0:
+        return 1, 0
+    best = (1, 0)
+    for cell in range(2, max_cell + 1):
+        sums = [0.0] * cell
+        # profile[i] is the change between pixel i and i + 1, i.e. a boundary at i + 1
+        for i, change in enumerate(profile):
+            sums[(i + 1) % cell] += change
+        offset = max(range(cell), key=sums.__getitem__)
+        if sums[offset] >= threshold * total:
+            best = (cell, offset)
+    return best
+
+def detect_pixel_grid(img, max_cell=128, threshold=0.8):
+    """Detect the effective pixel grid of upscaled pixel art
+
+    Returns (cell_x, offset_x, cell_y, offset_y); a cell of 1 means no grid.
+    """
+    cell_x, offset_x = _grid_period(_edge_profile(img, 0), max_cell, threshold)
+    cell_y, offset_y = _grid_period(_edge_profile(img, 1), max_cell, threshold)
+    return cell_x, offset_x, cell_y, offset_y
+
+def compact_pixel_art(source, max_colors=16, max_error=12.0):
+    """Snap pixel art to its grid and palette, and encode it as lossless WebP
+
+    The image is downsampled to its effective pixel grid (one sample from the
+    centre of each cell), quantized to max_colors and upscaled back with
+    nearest-neighbour, so flat-colour art compresses to a few KB. Partial
+    cells at the edges are dropped. Runs in a worker pool.
+
+    Returns the WebP bytes, or None if the image isn't pixel art (no grid, or
+    the result would differ from the original by more than max_error per channel).
+    """
+    from io import BytesIO
+    from PIL import Image, ImageChops, ImageStat
+
+    img = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    cell_x, offset_x, cell_y, offset_y = detect_pixel_grid(img)
+    if cell_x == 1 or cell_y == 1:
+        return None
+
+    grid_width = (img.size[0] - offset_x) // cell_x
+    grid_height = (img.size[1] - offset_y) // cell_y
+    box = (offset_x, offset_y, offset_x + grid_width * cell_x, offset_y + grid_height * cell_y)
+    small = img.resize((grid_width, grid_height), Image.NEAREST, box=box)
+
+    method = Image.Quantize.MEDIANCUT if small.mode == "RGB" else Image.Quantize.FASTOCTREE
+    small = small.quantize(colors=max_colors, method=method).convert(img.mode)
+    snapped = small.resize((box[2] - box[0], box[3] - box[1]), Image.NEAREST)
+
+    diff = ImageStat.Stat(ImageChops.difference(snapped, img.crop(box)))
+    if sum(diff.mean) / len(diff.mean) > max_error:
+        return None
+
+    buffer = BytesIO()
+    snapped.save(buffer, format="WEBP", lossless=True)
+    return buffer.getvalue()
+
+def render_thumbnail(source, width):
+    """Resize an image to width (keeping its aspect ratio) in its own format
+
+    Pixel art stays crisp: whole-number downscales use Image.reduce, which
+    averages grid-aligned cells exactly, and upscales use nearest-neighbour.
+    Other downscales use Lanczos. Runs in a worker pool.
+
+    Returns the encoded bytes (lossless WebP for WebP sources, PNG otherwise).
+    """
+    from io import BytesIO
+    from PIL import Image
+
+    img = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    image_format = img.format
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+
+    current_width, current_height = img.size
+    height = max(1, round(current_height * width / current_width))
+    if width > current_width:
+        img = img.resize((width, height), Image.NEAREST)
+    elif width < current_width:
+        factor = current_width // width
+        if current_width % width == 0 and current_height % factor == 0:
+            img = img.reduce(factor)
+        else:
+            img = img.resize((width, height), Image.LANCZOS)
+
+    buffer = BytesIO()
+    if image_format == "WEBP":
+        img.save(buffer, format="WEBP", lossless=True)
+    else:
+        img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+_image_executor = None
+
+def get_image_executor():
+    """Return the pool used for CPU-bound image work (IMAGE_POOL_KIND: process or thread)"""
+    global _image_executor
+    if _image_executor is None:
+        workers = max(1, image_pool_workers)
+        if image_pool_kind == "process":
+            _image_executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _image_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+    return _image_executor
+
+def shutdown_image_executor():
+    """Stop the image pool"""
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=False)
+        _image_executor = None
+
+async def run_image_task(fn, *args):
+    """Run an image function in the image pool without blocking the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(get_image_executor(), fn, *args)
@@ -0,0 +1,302 @@
+import asyncio
+import os
+import time
+import uuid
+
+from app.utils.ai import generate_meme_image_events
+from app.utils.metering import usage_context
+
+# Job settings with fallback to environment variables
+try:
+    from app.config.settings import settings
+    job_backend_name = settings.JOB_BACKEND
+    job_workers = settings.JOB_WORKERS
+    job_result_ttl = settings.JOB_RESULT_TTL
+    redis_url = settings.REDIS_URL
+except ImportError:
+    # Fallback for Vercel environment
+    job_backend_name = os.environ.get('JOB_BACKEND', 'inprocess')
+    job_workers = int(os.environ.get('JOB_WORKERS', '2'))
+    job_result_ttl = int(os.environ.get('JOB_RESULT_TTL', '3600'))
+    redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+def response_item(item, soldier_id=999):
+    """A generated item in the shape of the /meme/generate response (999 is the dummy ID of unsaved items)"""
+    return {
+        "id": soldier_id,
+        "name": item["name"],
+        "prompt": item["prompt"],
+        "image_url": item["image_url"],
+        "coin_icon_url": item["coin_icon_url"],
+        "coin_icon_variants": item.get("coin_icon_variants"),
+        "provider": item.get("provider")
+    }
+
+async def insert_generated_items(db, owner_id, items):
+    """Save generated items as MemeSoldier rows for owner_id in one transaction
+
+    All rows go in with a single multi-row INSERT ... RETURNING id, so the cost
+    doesn't grow with a round trip (or commit) per item, and a failure leaves
+    no partial rows. Returns the items in the /meme/generate response shape.
+    """
+    from app.models.meme_soldier import MemeSoldier
+
+    if not items:
+        return []
+    rows = [{
+        "owner_id": owner_id,
+        "name": item["name"],
+        "prompt": item["prompt"],
+        "image_url": item["image_url"],
+        "coin_icon_url": item["coin_icon_url"],
+        "coin_icon_variants": item.get("coin_icon_variants"),
+        "provider": item.get("provider"),
+        "deployed_to_battlefield": False,
+        "token_amount": 0,  # Will be set when minted
+        "token_amount_deployed": 0
+    } for item in items]
+    try:
+        # A Core insert, so the session routes it like any other write statement. Ids are
+        # assigned in VALUES order, but RETURNING may list them in any order, hence sorted()
+        table = MemeSoldier.__table__
+        ids = sorted((await db.scalars(table.insert().values(rows).returning(table.c.id))).all())
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return [response_item(item, soldier_id) for item, soldier_id in zip(items, ids)]
+
+async def persist_generated_items(owner_id, items):
+    """Save generated items as MemeSoldier rows for owner_id when a database is available
+
+    Returns the items in the same shape as the /meme/generate response.
+    """
+    if owner_id is None:
+        return [response_item(item) for item in items]
+
+    try:
+        from app.config.database import SessionLocal
+    except ImportError as e:
+        print(f"Database not available, job results not persisted: {e}")
+        return [response_item(item) for item in items]
+
+    async with SessionLocal() as db:
+        return await insert_generated_items(db, owner_id, items)
+
+async def run_generation_job(prompt, owner_id, report):
+    """Generate, name and persist the meme soldiers for one job
+
+    report(**fields) is called with progress updates (stage, progress, completed_items).
+    """
+    report(stage="parsing", progress=0.0)
+    items = []
+    finished = 0
+    total = 0
+
+    with usage_context("jobs", owner_id):
+        async for event in generate_meme_image_events(prompt):
+            if event["event"] == "parsed":
+                total = len(event["prompts"])
+                report(stage="generating", progress=0.1)
+            elif event["event"] in ("item", "item_error"):
+                finished += 1
+                if event["event"] == "item":
+                    items.append(event["item"])
+                report(progress=0.1 + 0.8 * finished / max(total, 1), completed_items=len(items))
+            elif event["event"] == "done" and not event["success"]:
+                raise RuntimeError(event["error"])
+
+    report(stage="saving", progress=0.9)
+    result_items = await persist_generated_items(owner_id, items)
+    return {"success": True, "items": result_items}
+
+def _new_job(job_id, prompt, owner_id):
+    now = time.time()
+    return {
+        "id": job_id,
+        "status": JOB_QUEUED,
+        "prompt": prompt,
+        "owner_id": owner_id,
+        "stage": None,
+        "progress": 0.0,
+        "completed_items": 0,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now
+    }
+
+class InProcessJobBackend:
+    """Runs jobs on asyncio worker tasks inside the API process (local / test use)
+
+    Job state is kept in memory and dropped result_ttl seconds after it finishes.
+    """
+
+    def __init__(self, workers=2, result_ttl=3600):
+        self.workers = max(1, workers)
+        self.result_ttl = result_ttl
+        self._jobs = {}
+        self._queue = None
+        self._worker_tasks = []
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        self._worker_tasks = [task for task in self._worker_tasks if not task.done()]
+        while len(self._worker_tasks) < self.workers:
+            self._worker_tasks.append(asyncio.ensure_future(self._worker()))
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in (JOB_COMPLETED, JOB_FAILED) and job["updated_at"] < cutoff
+        ]:
+            del self._jobs[job_id]
+
+    async def enqueue(self, prompt, owner_id=None):
+        self._prune()
+        self._ensure_workers()
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = _new_job(job_id, prompt, owner_id)
+        await self._queue.put(job_id)
+        return job_id
+
+    async def get(self, job_id):
+        job = self._jobs.get(job_id)
+        return dict(job) if job else None
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+
+            def report(**fields):
+                job.update(fields, updated_at=time.time())
+
+            report(status=JOB_RUNNING)
+            try:
+                result = await run_generation_job(job["prompt"], job["owner_id"], report)
+                report(status=JOB_COMPLETED, stage="done", progress=1.0, result=result)
+            except Exception as e:
+                print(f"Job {job_id} failed: {str(e)}")
+                report(status=JOB_FAILED, error=str(e))
+
+# Each Celery worker process keeps one event loop so the shared async clients stay usable
+_worker_loop = None
+
+def _run_celery_generation(task, prompt, owner_id=None):
+    """Celery task body: run a generation job, publishing progress as task state"""
+    global _worker_loop
+    if _worker_loop is None:
+        _worker_loop = asyncio.new_event_loop()
+    progress = {"stage": None, "progress": 0.0, "completed_items": 0}
+
+    def report(**fields):
+        progress.update(fields)
+        task.update_state(state="PROGRESS", meta=dict(progress))
+
+    return _worker_loop.run_until_complete(run_generation_job(prompt, owner_id, report))
+
+class CeleryJobBackend:
+    """Runs jobs on Celery workers with Redis as broker and result backend
+
+    Start a worker with: celery -A app.utils.jobs:celery_app worker
+
+    Celery reports any id it has never seen as PENDING, and doesn't know who
+    queued a job, so each issued job id is also recorded in Redis with its owner
+    for result_ttl after it was queued; ids without that record are unknown.
+    The Celery and Redis calls block, so they are run in the default executor.
+    """
+
+    CELERY_STATES = {
+        "PENDING": JOB_QUEUED,
+        "RECEIVED": JOB_QUEUED,
+        "STARTED": JOB_RUNNING,
+        "PROGRESS": JOB_RUNNING,
+        "RETRY": JOB_RUNNING,
+        "SUCCESS": JOB_COMPLETED,
+        "FAILURE": JOB_FAILED,
+        "REVOKED": JOB_FAILED
+    }
+    JOB_KEY = "memewarriors:job:{}"
+
+    def __init__(self, broker_url, result_ttl=3600):
+        import redis
+        from celery import Celery
+
+        self.result_ttl = result_ttl
+        self.redis = redis.Redis.from_url(broker_url)
+        self.celery = Celery("memewarriors", broker=broker_url, backend=broker_url)
+        self.celery.conf.update(
+            task_track_started=True,
+            result_expires=result_ttl,
+            task_acks_late=True,
+            worker_prefetch_multiplier=1
+        )
+        self.generate_task = self.celery.task(bind=True, name="memewarriors.generate")(_run_celery_generation)
+
+    def _enqueue(self, prompt, owner_id):
+        job_id = uuid.uuid4().hex
+        self.redis.set(self.JOB_KEY.format(job_id), "" if owner_id is None else str(owner_id), ex=self.result_ttl)
+        self.generate_task.apply_async(args=[prompt, owner_id], task_id=job_id)
+        return job_id
+
+    async def enqueue(self, prompt, owner_id=None):
+        return await asyncio.get_running_loop().run_in_executor(None, self._enqueue, prompt, owner_id)
+
+    def _get(self, job_id):
+        from celery.result import AsyncResult
+
+        owner = self.redis.get(self.JOB_KEY.format(job_id))
+        if owner is None:
+            return None
+        async_result = AsyncResult(job_id, app=self.celery)
+        state = async_result.state
+        job = {
+            "id": job_id,
+            "owner_id": int(owner) if owner else None,
+            "status": self.CELERY_STATES.get(state, JOB_RUNNING),
+            "stage": None,
+            "progress": 0.0,
+            "completed_items": 0,
+            "result": None,
+            "error": None
+        }
+        if state == "PROGRESS" and isinstance(async_result.info, dict):
+            job.update(async_result.info)
+        elif state == "SUCCESS":
+            job.update(stage="done", progress=1.0, result=async_result.result)
+        elif state in ("FAILURE", "REVOKED"):
+            job["error"] = str(async_result.result)
+        return job
+
+    async def get(self, job_id):
+        return await asyncio.get_running_loop().run_in_executor(None, self._get, job_id)
+
+def _create_job_backend():
+    """Build the backend selected by JOB_BACKEND ("inprocess" or "celery")"""
+    if job_backend_name == "celery":
+        try:
+            return CeleryJobBackend(redis_url, result_ttl=job_result_ttl)
+        except Exception as e:
+            print(f"Error initializing Celery job backend, using in-process jobs: {str(e)}")
+    return InProcessJobBackend(workers=job_workers, result_ttl=job_result_ttl)
+
+job_backend = _create_job_backend()
+celery_app = job_backend.celery if isinstance(job_backend, CeleryJobBackend) else None
+
+async def enqueue_generation_job(prompt, owner_id=None):
+    """Queue a meme generation and return its job id"""
+    return await job_backend.enqueue(prompt, owner_id)
+
+async def get_generation_job(job_id):
+    """Return the status, progress and result of a job, or None if it is unknown"""
+    return await job_backend.get(job_id)
@@ -0,0 +1,211 @@
+import contextvars
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Metering settings with fallback to environment variables
+try:
+    from app.config.settings import settings
+    metering_response_header = settings.METERING_RESPONSE_HEADER
+except ImportError:
+    # Fallback for Vercel environment
+    import os
+    metering_response_header = os.environ.get('METERING_RESPONSE_HEADER', 'False').lower() == 'true'
+
+USAGE_HEADER = "X-OpenAI-Usage"
+
+# List prices in USD (per token for chat, per image for 1024x1024 DALL-E 2)
+MODEL_PRICES = {
+    "gpt-3.5-turbo": {"input": 0.0015 / 1000, "output": 0.002 / 1000},
+    "dall-e-2": {"image": 0.020},
+}
+
+# Upper bounds (seconds) of the upstream latency histogram buckets
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+def estimate_cost(model, input_tokens=0, output_tokens=0, images=0):
+    """Estimated USD cost of a call from the list prices (0 for unknown models)"""
+    prices = MODEL_PRICES.get(model, {})
+    return (
+        input_tokens * prices.get("input", 0.0)
+        + output_tokens * prices.get("output", 0.0)
+        + images * prices.get("image", 0.0)
+    )
+
+def usage_from_response(response):
+    """Return (input_tokens, output_tokens, images) of an OpenAI SDK response"""
+    usage = getattr(response, "usage", None)
+    input_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    output_tokens = getattr(usage, "completion_tokens", 0) or 0
+    images = len(getattr(response, "data", None) or []) if usage is None else 0
+    return input_tokens, output_tokens, images
+
+class Usage:
+    """Upstream usage attributed to one endpoint and user (e.g. a single request)
+
+    For HTTP requests the endpoint is the route's path template, resolved from
+    the ASGI scope once routing has filled in the path parameters.
+    """
+
+    def __init__(self, endpoint, user=None, scope=None):
+        self._endpoint = endpoint
+        self.user = user
+        self.scope = scope
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.images = 0
+        self.cost = 0.0
+
+    def add(self, input_tokens, output_tokens, images, cost):
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.images += images
+        self.cost += cost
+
+    @property
+    def endpoint(self):
+        if self.scope is None:
+            return self._endpoint
+        # /meme/jobs/<id> is reported as /meme/jobs/{job_id} to keep label cardinality bounded
+        path = self.scope.get("path", self._endpoint)
+        for name, value in (self.scope.get("path_params") or {}).items():
+            path = path.replace(str(value), "{" + name + "}")
+        return path
+
+    def header_value(self):
+        return (
+            f"calls={self.calls}; input_tokens={self.input_tokens}; output_tokens={self.output_tokens}; "
+            f"images={self.images}; cost_usd={self.cost:.6f}"
+        )
+
+_current_usage = contextvars.ContextVar("upstream_usage", default=None)
+
+@contextmanager
+def usage_context(endpoint, user=None, scope=None):
+    """Attribute upstream calls made inside the block (and tasks it starts) to endpoint and user"""
+    usage = Usage(endpoint, user, scope)
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+def current_usage():
+    return _current_usage.get()
+
+def set_user(user):
+    """Attribute the rest of the current request's upstream calls to user"""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.user = user
+
+class Meter:
+    """Aggregated upstream usage by endpoint, user, operation, model and outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.input_tokens = defaultdict(int)
+        self.output_tokens = defaultdict(int)
+        self.images = defaultdict(int)
+        self.cost = defaultdict(float)
+        # Latency per (operation, model, outcome): bucket counts, sum and count
+        self.latency_buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+        self.latency_sum = defaultdict(float)
+        self.latency_count = defaultdict(int)
+
+    def record(self, operation, model, outcome, latency, input_tokens=0, output_tokens=0, images=0):
+        """Record one upstream call and add it to the current request's usage"""
+        cost = estimate_cost(model, input_tokens, output_tokens, images)
+        usage = _current_usage.get()
+        if usage is not None and outcome == "ok":
+            usage.add(input_tokens, output_tokens, images, cost)
+
+        endpoint = usage.endpoint if usage is not None else "background"
+        user = str(usage.user) if usage is not None and usage.user is not None else "anonymous"
+        key = (endpoint, user, operation, model, outcome)
+        latency_key = (operation, model, outcome)
+        with self._lock:
+            self.calls[key] += 1
+            self.input_tokens[key] += input_tokens
+            self.output_tokens[key] += output_tokens
+            self.images[key] += images
+            self.cost[key] += cost
+            if latency is not None:
+                buckets = self.latency_buckets[latency_key]
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if latency <= bound:
+                        buckets[i] += 1
+                self.latency_sum[latency_key] += latency
+                self.latency_count[latency_key] += 1
+
+    def render_prometheus(self):
+        """Render the counters in the Prometheus text exposition format"""
+        usage_labels = ("endpoint", "user", "operation", "model", "outcome")
+        latency_labels = ("operation", "model", "outcome")
+        lines = []
+        with self._lock:
+            for name, help_text, values in (
+                ("openai_requests_total", "Upstream OpenAI calls", self.calls),
+                ("openai_input_tokens_total", "Prompt tokens sent to OpenAI", self.input_tokens),
+                ("openai_output_tokens_total", "Completion tokens returned by OpenAI", self.output_tokens),
+                ("openai_images_total", "Images generated by OpenAI", self.images),
+                ("openai_cost_usd_total", "Estimated OpenAI spend in USD at list prices", self.cost),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(values.items()):
+                    lines.append(f"{name}{{{_labels(usage_labels, key)}}} {value}")
+
+            name = "openai_request_duration_seconds"
+            lines.append(f"# HELP {name} Upstream OpenAI call latency, including retries")
+            lines.append(f"# TYPE {name} histogram")
+            for key in sorted(self.latency_count):
+                labels = _labels(latency_labels, key)
+                for bound, count in zip(LATENCY_BUCKETS, self.latency_buckets[key]):
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.latency_count[key]}')
+                lines.append(f"{name}_sum{{{labels}}} {self.latency_sum[key]}")
+                lines.append(f"{name}_count{{{labels}}} {self.latency_count[key]}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+meter = Meter()
+
+class UsageMiddleware:
+    """ASGI middleware giving every HTTP request its own usage context
+
+    With METERING_RESPONSE_HEADER set, responses carry the request's upstream
+    usage in an X-OpenAI-Usage header. Streamed responses send their headers
+    before generating, so the header only covers usage up to that point.
+    """
+
+    def __init__(self, app, response_header=None):
+        self.app = app
+        self.response_header = metering_response_header if response_header is None else response_header
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with usage_context(scope.get("path", ""), scope=scope) as usage:
+            if not self.response_header:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_usage(message):
+                if message["type"] == "http.response.start" and usage.calls:
+                    headers = list(message.get("headers", []))
+                    headers.append((USAGE_HEADER.lower().encode("latin-1"), usage.header_value().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_usage)
@@ -0,0 +1,64 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, bindparam, or_
+from sqlalchemy.dialects import sqlite
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# SQLite stores server-side timestamps as text without fractional seconds, and
+# compares them as text, so cursor values are bound in the same format
+CURSOR_DATETIME = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(
+        storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"
+    ),
+    "sqlite"
+)
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(created_at, row_id):
+    """Opaque cursor pointing just past the row with this (created_at, id)"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) of a cursor, raising InvalidCursor if it wasn't made by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(row_id, int):
+            raise ValueError(row_id)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+def keyset_page(query, created_at_column, id_column, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Restrict query to the page after cursor, newest first by (created_at, id)
+
+    Instead of OFFSET, the page starts right after the last row of the previous
+    one. created_at <= :created_at is a range on the (..., created_at) index, so
+    the page is found with an index seek no matter how deep it is; the id
+    comparison only breaks ties between rows created in the same second.
+    One extra row is fetched to tell whether there is a next page (see page_result).
+    """
+    if cursor is not None:
+        created_at, row_id = decode_cursor(cursor)
+        created_at_param = bindparam(None, created_at, type_=CURSOR_DATETIME)
+        query = query.where(and_(
+            created_at_column <= created_at_param,
+            or_(created_at_column < created_at_param, id_column < row_id)
+        ))
+    return query.order_by(created_at_column.desc(), id_column.desc()).limit(limit + 1)
+
+def page_result(rows, limit):
+    """Split fetched rows into the page and the cursor of the next one (None on the last page)"""
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
@@ -0,0 +1,94 @@
+import colorsys
+import hashlib
+import random
+from io import BytesIO
+
+# Sprite grid (before upscaling); the left half is mirrored onto the right
+GRID_SIZE = 16
+
+NAME_PREFIXES = ["Pixel", "Turbo", "Mega", "Captain", "Sir", "Lil", "Chonk", "Glitch", "Neon", "Retro"]
+NAME_SUFFIXES = ["Warrior", "Knight", "Blaster", "Bandit", "Goblin", "Ranger", "Titan", "Sprite", "Rogue", "Champ"]
+
+def prompt_seed(prompt):
+    """Stable integer seed for a prompt"""
+    return int(hashlib.sha256(prompt.strip().lower().encode("utf-8")).hexdigest()[:16], 16)
+
+def _palette(rng):
+    """Small palette: background, outline, 2 body shades and an accent"""
+    hue = rng.random()
+    accent_hue = (hue + rng.choice([0.33, 0.5, 0.66])) % 1.0
+
+    def rgb(h, s, v):
+        return tuple(int(c * 255) for c in colorsys.hsv_to_rgb(h, s, v))
+
+    return {
+        "background": rgb((hue + 0.5) % 1.0, 0.15, 0.95),
+        "outline": rgb(hue, 0.6, 0.2),
+        "body": rgb(hue, 0.7, 0.85),
+        "shade": rgb(hue, 0.75, 0.6),
+        "accent": rgb(accent_hue, 0.8, 0.95)
+    }
+
+def _sprite_grid(rng):
+    """Random symmetric body mask with eyes, shading and an outline"""
+    half = GRID_SIZE // 2
+    grid = [[None] * GRID_SIZE for _ in range(GRID_SIZE)]
+
+    # Body: denser towards the centre column so the shape reads as a character
+    for y in range(2, GRID_SIZE - 2):
+        for x in range(2, half):
+            density = 0.25 + 0.6 * (x / half)
+            if rng.random() < density:
+                cell = "shade" if y > GRID_SIZE * 0.65 else "body"
+                grid[y][x] = cell
+                grid[y][GRID_SIZE - 1 - x] = cell
+
+    # Eyes
+    eye_y = rng.randint(4, 6)
+    eye_x = rng.randint(half - 3, half - 2)
+    for x in (eye_x, GRID_SIZE - 1 - eye_x):
+        grid[eye_y][x] = "accent"
+        grid[eye_y + 1][x] = "outline"
+
+    # Outline every empty cell that touches the body
+    outlined = [row[:] for row in grid]
+    for y in range(GRID_SIZE):
+        for x in range(GRID_SIZE):
+            if grid[y][x] is not None:
+                continue
+            for dy, dx in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                ny, nx = y + dy, x + dx
+                if 0 <= ny < GRID_SIZE and 0 <= nx < GRID_SIZE and grid[ny][nx] not in (None, "outline"):
+                    outlined[y][x] = "outline"
+                    break
+    return outlined
+
+def render_sprite(prompt, size=1024):
+    """Render a deterministic pixel-art sprite for prompt as PNG bytes
+
+    The same prompt always gives the same sprite. The grid is upscaled with
+    nearest-neighbour so it stays crisp at any size.
+    """
+    from PIL import Image
+
+    rng = random.Random(prompt_seed(prompt))
+    palette = _palette(rng)
+    grid = _sprite_grid(rng)
+
+    img = Image.new("P", (GRID_SIZE, GRID_SIZE))
+    names = list(palette)
+    flat_palette = []
+    for name in names:
+        flat_palette.extend(palette[name])
+    img.putpalette(flat_palette)
+    img.putdata([names.index(cell or "background") for row in grid for cell in row])
+    img = img.resize((size, size), Image.NEAREST)
+
+    buffer = BytesIO()
+    img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+def sprite_name(prompt):
+    """Deterministic meme soldier name for prompt"""
+    rng = random.Random(prompt_seed(prompt) ^ 0x5EED)
+    return f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_SUFFIXES)}"
@@ -0,0 +1,40 @@
+import asyncio
+import copy
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution
+
+    The first caller for a key starts the work; callers arriving while it is
+    still in flight wait for the same result instead of starting their own.
+    Each caller gets its own deep copy of the result so they can modify it freely.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._in_flight = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, /, *args, **kwargs):
+        """Run fn(*args, **kwargs) for key, or join the call already in flight"""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shield the shared task so one caller going away doesn't cancel it for the others
+        result = await asyncio.shield(task)
+        return copy.deepcopy(result)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight)
+        }
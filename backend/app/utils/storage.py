@@ -0,0 +1,304 @@
+import asyncio
+import datetime
+import hashlib
+import hmac
+import os
+import re
+from urllib.parse import quote, urlsplit
+
+from app.utils.http import get_http_client, write_file_atomic
+
+# Storage settings with fallback to environment variables
+try:
+    from app.config.settings import settings
+    storage_backend = settings.STORAGE_BACKEND
+    meme_storage_path = settings.MEME_STORAGE_PATH
+    s3_endpoint_url = settings.S3_ENDPOINT_URL
+    s3_bucket = settings.S3_BUCKET
+    s3_access_key_id = settings.S3_ACCESS_KEY_ID
+    s3_secret_access_key = settings.S3_SECRET_ACCESS_KEY
+    s3_region = settings.S3_REGION
+    s3_public_base_url = settings.S3_PUBLIC_BASE_URL
+except ImportError:
+    # Fallback for Vercel environment
+    storage_backend = os.environ.get('STORAGE_BACKEND', '')
+    meme_storage_path = os.environ.get('MEME_STORAGE_PATH', './meme_images')
+    s3_endpoint_url = os.environ.get('S3_ENDPOINT_URL', '')
+    s3_bucket = os.environ.get('S3_BUCKET', '')
+    s3_access_key_id = os.environ.get('S3_ACCESS_KEY_ID', '')
+    s3_secret_access_key = os.environ.get('S3_SECRET_ACCESS_KEY', '')
+    s3_region = os.environ.get('S3_REGION', 'us-east-1')
+    s3_public_base_url = os.environ.get('S3_PUBLIC_BASE_URL', '')
+
+# Stored objects are content-addressed, so they never change once written
+IMMUTABLE_MAX_AGE = 31536000
+IMMUTABLE_CACHE_CONTROL = f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+CONTENT_KEY_RE = re.compile(r"^(?:coin_(?:\d+_)?)?[0-9a-f]{32}\.[a-z0-9]+$")
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def content_key(data, extension, prefix=""):
+    """Object key derived from the content, so the same bytes always get the same key"""
+    return f"{prefix}{content_hash(data)}{extension}"
+
+def is_content_key(name):
+    """Whether name is a content-addressed image (or coin icon derived from one)"""
+    return CONTENT_KEY_RE.match(name) is not None
+
+class LocalStorage:
+    """Files in a local directory, served by the app under base_url"""
+    name = "local"
+
+    def __init__(self, root, base_url="/images"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def local_path(self, key):
+        return os.path.join(self.root, key)
+
+    async def put(self, key, data, content_type="image/png"):
+        path = self.local_path(key)
+        if os.path.dirname(key):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        await write_file_atomic(path, data)
+        return self.url(key)
+
+    async def adopt(self, key, extension, prefix=""):
+        """Move a file already written under key to its content-addressed key, returning the new key"""
+        path = self.local_path(key)
+
+        def hash_and_move():
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            new_key = f"{prefix}{digest.hexdigest()[:32]}{extension}"
+            new_path = self.local_path(new_key)
+            if prefix:
+                os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            os.replace(path, new_path)
+            return new_key
+
+        return await asyncio.get_running_loop().run_in_executor(None, hash_and_move)
+
+    async def get(self, key):
+        path = self.local_path(key)
+        if not os.path.exists(path):
+            return None
+
+        def read():
+            with open(path, "rb") as f:
+                return f.read()
+
+        return await asyncio.get_running_loop().run_in_executor(None, read)
+
+    async def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    async def delete(self, key):
+        def remove():
+            try:
+                os.remove(self.local_path(key))
+            except FileNotFoundError:
+                pass
+
+        await asyncio.get_running_loop().run_in_executor(None, remove)
+
+    def url(self, key):
+        return f"{self.base_url}/{key}"
+
+class VercelBlobStorage:
+    """Vercel Blob, called over its HTTP API with the shared pooled client
+
+    The public URL of a blob is derived from the store id in the read/write
+    token, so url() doesn't need a round trip.
+    """
+    name = "vercel_blob"
+    API_URL = "https://blob.vercel-storage.com"
+    API_VERSION = "7"
+
+    def __init__(self, token, base_url=None):
+        self.token = token
+        if base_url is None:
+            # Tokens look like vercel_blob_rw_<store id>_<secret>
+            parts = token.split("_")
+            store_id = parts[3].lower() if len(parts) > 3 else ""
+            base_url = f"https://{store_id}.public.blob.vercel-storage.com"
+        self.base_url = base_url.rstrip("/")
+
+    def _headers(self, **extra):
+        return {
+            "authorization": f"Bearer {self.token}",
+            "x-api-version": self.API_VERSION,
+            **extra
+        }
+
+    async def put(self, key, data, content_type="image/png"):
+        response = await get_http_client().put(
+            f"{self.API_URL}/{quote(key)}",
+            content=data,
+            headers=self._headers(**{
+                "x-content-type": content_type,
+                "x-add-random-suffix": "0",
+                "x-cache-control-max-age": str(IMMUTABLE_MAX_AGE)
+            })
+        )
+        response.raise_for_status()
+        return response.json()["url"]
+
+    async def get(self, key):
+        response = await get_http_client().get(self.url(key))
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    async def exists(self, key):
+        response = await get_http_client().get(
+            self.API_URL, params={"url": self.url(key)}, headers=self._headers()
+        )
+        return response.status_code == 200
+
+    async def delete(self, key):
+        response = await get_http_client().post(
+            f"{self.API_URL}/delete", json={"urls": [self.url(key)]}, headers=self._headers()
+        )
+        response.raise_for_status()
+
+    def url(self, key):
+        return f"{self.base_url}/{quote(key)}"
+
+def _hmac_sha256(key, message):
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+class S3Storage:
+    """S3-compatible object storage (AWS S3, MinIO, R2, ...)
+
+    Requests use path-style addressing and AWS Signature Version 4, sent through
+    the shared pooled client. Objects are served from public_base_url if set
+    (e.g. a CDN in front of the bucket), otherwise from the endpoint directly.
+    """
+    name = "s3"
+
+    def __init__(self, endpoint_url, bucket, access_key_id, secret_access_key,
+                 region="us-east-1", public_base_url=""):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.public_base_url = (public_base_url or f"{self.endpoint_url}/{bucket}").rstrip("/")
+
+    def _object_path(self, key):
+        return "/" + quote(f"{self.bucket}/{key}", safe="/-_.~")
+
+    def _signed_headers(self, method, path, payload, headers=None):
+        """Return the request headers, including the SigV4 Authorization header"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+        payload_hash = hashlib.sha256(payload).hexdigest()
+
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        headers.update({
+            "host": urlsplit(self.endpoint_url).netloc,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": amz_date
+        })
+        signed_headers = ";".join(sorted(headers))
+        canonical_headers = "".join(f"{key}:{str(headers[key]).strip()}\n" for key in sorted(headers))
+        canonical_request = "\n".join([
+            method, path, "", canonical_headers, signed_headers, payload_hash
+        ])
+
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+        ])
+        signing_key = ("AWS4" + self.secret_access_key).encode("utf-8")
+        for part in (date, self.region, "s3", "aws4_request"):
+            signing_key = _hmac_sha256(signing_key, part)
+        signature = hmac.new(signing_key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key_id}/{scope}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        return headers
+
+    async def _request(self, method, key, payload=b"", headers=None):
+        path = self._object_path(key)
+        return await get_http_client().request(
+            method,
+            f"{self.endpoint_url}{path}",
+            content=payload,
+            headers=self._signed_headers(method, path, payload, headers)
+        )
+
+    async def put(self, key, data, content_type="image/png"):
+        response = await self._request("PUT", key, data, {
+            "content-type": content_type,
+            "cache-control": IMMUTABLE_CACHE_CONTROL
+        })
+        response.raise_for_status()
+        return self.url(key)
+
+    async def get(self, key):
+        response = await self._request("GET", key)
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    async def exists(self, key):
+        response = await self._request("HEAD", key)
+        return response.status_code == 200
+
+    async def delete(self, key):
+        response = await self._request("DELETE", key)
+        if response.status_code not in (200, 204, 404):
+            response.raise_for_status()
+
+    def url(self, key):
+        return f"{self.public_base_url}/{quote(key)}"
+
+def _create_storage():
+    """Build the backend selected by STORAGE_BACKEND
+
+    Without a setting, Vercel uses Blob storage if BLOB_READ_WRITE_TOKEN is set
+    and everything else the local filesystem. Returns None on Vercel without
+    Blob storage, where there is nowhere persistent to put files.
+    """
+    backend = storage_backend
+    blob_token = os.environ.get('BLOB_READ_WRITE_TOKEN')
+    if not backend:
+        if os.environ.get('VERCEL') == '1':
+            backend = "vercel_blob" if blob_token else ""
+        else:
+            backend = "local"
+
+    if backend == "local":
+        return LocalStorage(meme_storage_path)
+    if backend == "vercel_blob" and blob_token:
+        return VercelBlobStorage(blob_token)
+    if backend == "s3":
+        return S3Storage(
+            s3_endpoint_url, s3_bucket, s3_access_key_id, s3_secret_access_key,
+            s3_region, s3_public_base_url
+        )
+    if backend:
+        print(f"WARNING: Storage backend {backend} is not configured, generated images will not be stored")
+    return None
+
+storage = _create_storage()
+
+def get_storage():
+    """Return the configured storage backend, or None if there is none"""
+    return storage
+
+def set_storage(backend):
+    """Replace the storage backend (e.g. a LocalStorage in a temp directory for tests)"""
+    global storage
+    storage = backend
@@ -0,0 +1,68 @@
+import asyncio
+import os
+
+from app.utils.cache import DiskLRUCache
+from app.utils.images import parse_sizes, render_thumbnail, run_image_task
+from app.utils.singleflight import SingleFlight
+from app.utils.storage import LocalStorage, get_storage
+
+# Thumbnail settings with fallback to environment variables
+try:
+    from app.config.settings import settings
+    thumbnail_sizes = settings.THUMBNAIL_SIZES
+    thumbnail_cache_dir = settings.THUMBNAIL_CACHE_DIR
+    thumbnail_cache_max_bytes = settings.THUMBNAIL_CACHE_MAX_BYTES
+except ImportError:
+    # Fallback for Vercel environment (only /tmp is writable there)
+    thumbnail_sizes = os.environ.get('THUMBNAIL_SIZES', '32,64,128,256,512,1024,2048')
+    thumbnail_cache_dir = os.environ.get('THUMBNAIL_CACHE_DIR', '/tmp/thumbnail_cache')
+    thumbnail_cache_max_bytes = int(os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', '268435456'))
+
+THUMBNAIL_WIDTHS = sorted(parse_sizes(thumbnail_sizes))
+
+# Created on first use so importing this module never touches the filesystem
+_thumbnail_cache = None
+
+def get_thumbnail_cache():
+    """Return the on-disk LRU cache of rendered thumbnails"""
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        _thumbnail_cache = DiskLRUCache(thumbnail_cache_dir, thumbnail_cache_max_bytes)
+    return _thumbnail_cache
+
+def get_thumbnail_cache_stats():
+    """Return size and hit rate of the thumbnail cache"""
+    if _thumbnail_cache is None:
+        return {"entries": 0}
+    return _thumbnail_cache.stats()
+
+thumbnail_flight = SingleFlight("thumbnail")
+
+async def get_thumbnail(name, width):
+    """Return the path of the width px variant of a stored image
+
+    Repeats are served from the disk cache; the first request renders it in the
+    image worker pool (concurrent requests for the same variant share one
+    render). Returns None if the image doesn't exist.
+    """
+    key = f"{width}_{name}"
+    path = get_thumbnail_cache().get(key)
+    if path is not None:
+        return path
+    return await thumbnail_flight.do(key, _render_thumbnail, name, width, key)
+
+async def _render_thumbnail(name, width, key):
+    storage = get_storage()
+    if storage is None:
+        return None
+    if isinstance(storage, LocalStorage):
+        source = storage.local_path(name)
+        if not os.path.exists(source):
+            return None
+    else:
+        source = await storage.get(name)
+        if source is None:
+            return None
+
+    data = await run_image_task(render_thumbnail, source, width)
+    return await asyncio.get_running_loop().run_in_executor(None, get_thumbnail_cache().put, key, data)
@@ -0,0 +1,402 @@
+import asyncio
+import contextvars
+import random
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+try:
+    import openai
+    RETRYABLE_ERRORS = (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )
+except (ImportError, AttributeError):
+    openai = None
+    RETRYABLE_ERRORS = ()
+
+class TokenBucket:
+    """Token bucket refilled at rate_per_minute, holding at most capacity tokens
+
+    The rate adapts to the upstream: it is cut when we get rate limited and
+    creeps back up to the configured rate after successful calls.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.max_rate = rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = capacity or max(1.0, rate_per_minute / 60.0 * 5)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Take one token, sleeping until it is available
+
+        Callers reserve tokens in arrival order by letting the balance go
+        negative, so no lock is needed on a single event loop.
+        """
+        self._refill()
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+    def on_rate_limited(self):
+        """Multiplicative decrease after a 429"""
+        self._refill()
+        self.rate = max(self.max_rate / 20, self.rate / 2)
+
+    def on_success(self):
+        """Additive increase back towards the configured rate"""
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+class UpstreamLimiter:
+    """Rate limit, concurrency cap and metrics for one upstream model"""
+
+    def __init__(self, name, rate_per_minute, max_concurrency):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self._semaphore = None
+        self._semaphore_loop = None
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.queue_wait_total = 0.0
+        self.upstream_latency_total = 0.0
+
+    def semaphore(self):
+        # Created per event loop so Celery workers and tests get a usable one
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def stats(self):
+        attempts = self.calls + self.retries
+        return {
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "current_rate_per_minute": round(self.bucket.rate * 60, 2),
+            "avg_queue_wait": self.queue_wait_total / attempts if attempts else 0.0,
+            "avg_upstream_latency": self.upstream_latency_total / attempts if attempts else 0.0
+        }
+
+def _parse_duration(value):
+    """Parse an OpenAI reset header such as "1s", "6m0s" or "20ms" into seconds"""
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+def retry_after_seconds(error):
+    """Return how long the upstream asked us to wait before retrying, if it said"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if headers.get("retry-after"):
+        value = headers["retry-after"]
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    for header in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        if headers.get(header):
+            seconds = _parse_duration(headers[header])
+            if seconds is not None:
+                return seconds
+    return None
+
+class UpstreamClient:
+    """Runs upstream calls through per-model limiters with jittered exponential retry"""
+
+    def __init__(self, limits, default_limit=(60, 4), max_retries=3, base_delay=0.5, max_delay=20.0):
+        self.limits = limits
+        self.default_limit = default_limit
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiters = {}
+
+    def limiter(self, model):
+        if model not in self.limiters:
+            rate_per_minute, max_concurrency = self.limits.get(model, self.default_limit)
+            self.limiters[model] = UpstreamLimiter(model, rate_per_minute, max_concurrency)
+        return self.limiters[model]
+
+    def _backoff(self, attempt, error):
+        # Full jitter, but never retry sooner than the upstream asked us to
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    async def call(self, model, fn, /, *args, **kwargs):
+        """Await fn(*args, **kwargs) under the model's limits, retrying transient errors"""
+        limiter = self.limiter(model)
+        limiter.calls += 1
+        attempt = 0
+        while True:
+            queued_at = time.monotonic()
+            async with limiter.semaphore():
+                await limiter.bucket.acquire()
+                started_at = time.monotonic()
+                limiter.queue_wait_total += started_at - queued_at
+                try:
+                    result = await fn(*args, **kwargs)
+                except RETRYABLE_ERRORS as e:
+                    limiter.upstream_latency_total += time.monotonic() - started_at
+                    if openai is not None and isinstance(e, openai.RateLimitError):
+                        limiter.rate_limited += 1
+                        limiter.bucket.on_rate_limited()
+                    if attempt >= self.max_retries:
+                        limiter.failures += 1
+                        raise
+                    error = e
+                except Exception:
+                    limiter.upstream_latency_total += time.monotonic() - started_at
+                    limiter.failures += 1
+                    raise
+                else:
+                    limiter.upstream_latency_total += time.monotonic() - started_at
+                    limiter.successes += 1
+                    limiter.bucket.on_success()
+                    return result
+
+            # Sleep outside the concurrency slot so other calls can proceed
+            await asyncio.sleep(self._backoff(attempt, error))
+            attempt += 1
+            limiter.retries += 1
+
+    def stats(self):
+        return {model: limiter.stats() for model, limiter in self.limiters.items()}
+
+# Absolute monotonic deadline of the current request, inherited by tasks it creates
+_deadline = contextvars.ContextVar("upstream_deadline", default=None)
+
+@contextmanager
+def latency_budget(seconds):
+    """Give everything run inside this block at most `seconds` in total
+
+    Nested budgets can only shorten the deadline, never extend it.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_budget():
+    """Seconds left in the current latency budget, or None if there is no budget"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling upstream when its breaker is open or the budget is spent"""
+
+class CircuitBreaker:
+    """Stops calling an operation after repeated failures
+
+    After failure_threshold consecutive failures the breaker opens and calls
+    are refused for reset_timeout seconds. It then lets one trial call through
+    (half-open); success closes it again, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow(self):
+        """Return True if a call may go upstream now"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open trial slot when the call was abandoned without a result"""
+        self._trial_in_flight = False
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened
+        }
+
+def is_upstream_failure(error):
+    """Return True if error says the upstream is unhealthy: retryable errors (including
+    upstream timeouts) and 5xx responses
+
+    Client errors (4xx, e.g. a prompt rejected by the content policy) are about
+    the request rather than the upstream, so they don't count towards a breaker.
+    Neither does the latency budget running out, which is often time spent
+    queued in the local rate limiter rather than waiting on the upstream.
+    """
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and status_code >= 500
+
+async def guarded_call(breaker, min_budget, call):
+    """Await call() unless the breaker is open or less than min_budget seconds remain
+
+    Raises UpstreamUnavailable without calling upstream in those cases, so the
+    caller can go straight to its local fallback. The call is cut off with
+    asyncio.TimeoutError when the latency budget runs out. Only upstream failures
+    (see is_upstream_failure) count towards opening the breaker; other errors,
+    including the budget cutoff, are passed through.
+    """
+    remaining = remaining_budget()
+    if remaining is not None and remaining < min_budget:
+        raise UpstreamUnavailable(f"{breaker.name}: latency budget exhausted")
+    if not breaker.allow():
+        raise UpstreamUnavailable(f"{breaker.name}: circuit open")
+
+    try:
+        if remaining is None:
+            result = await call()
+        else:
+            result = await asyncio.wait_for(call(), timeout=remaining)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception as e:
+        if is_upstream_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        raise
+    breaker.record_success()
+    return result
+
+class Hedger:
+    """Issues a duplicate call when the first one is slower than usual
+
+    If a call hasn't finished after the given percentile of recent latencies,
+    a second identical call is started and whichever finishes first wins. Extra
+    calls are capped at max_extra_ratio of all calls to bound the added spend.
+    """
+
+    def __init__(self, name, percentile=0.95, max_extra_ratio=0.1, min_samples=20, window=200):
+        self.name = name
+        self.percentile = percentile
+        self.max_extra_ratio = max_extra_ratio
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None until enough latencies are known"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def _can_hedge(self):
+        return self.hedges_fired < self.max_extra_ratio * self.calls
+
+    async def call(self, make_call):
+        """Await make_call(), hedging with a second make_call() if the first is slow"""
+        self.calls += 1
+        started_at = time.monotonic()
+        primary = asyncio.ensure_future(make_call())
+        delay = self.hedge_delay()
+        tasks = {primary}
+        try:
+            if delay is not None and self._can_hedge():
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    self.hedges_fired += 1
+                    tasks.add(asyncio.ensure_future(make_call()))
+
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedges_won += 1
+                        # The latency the caller saw, so won hedges don't drag the percentile down
+                        self.latencies.append(time.monotonic() - started_at)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        delay = self.hedge_delay()
+        return {
+            "calls": self.calls,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedge_delay": delay
+        }
@@ -0,0 +1,161 @@
+import asyncio
+import time
+from collections import Counter, deque
+
+from app.utils.cache import normalize_prompt
+
+class WarmPool:
+    """Keeps pre-generated results in stock for the most requested prompts
+
+    Every request is counted by normalized prompt (and the items it parsed
+    into). Whenever can_refill() says there is spare capacity, a background
+    task tops up the stock of the top max_themes prompts to stock_per_theme
+    results each. A request for a stocked prompt is served instantly from the
+    pool and refilled later. Stock is evicted when its prompt drops out of the
+    top themes or gets older than ttl seconds; evicted results are passed to
+    discard (if given) from the background task, to clean up what they stored.
+    """
+
+    def __init__(self, generate, can_refill, max_themes=20, stock_per_theme=2,
+                 ttl=3600, interval=5.0, decay=0.9, decay_interval=600, discard=None):
+        self.generate = generate
+        self.can_refill = can_refill
+        self.discard = discard
+        self.max_themes = max_themes
+        self.stock_per_theme = stock_per_theme
+        self.ttl = ttl
+        self.interval = interval
+        self.decay = decay
+        self.decay_interval = decay_interval
+        self.prompt_counts = Counter()
+        self.item_counts = Counter()
+        self.prompts = {}
+        self.stock = {}
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.evicted = 0
+        self._last_decay = time.monotonic()
+        self._task = None
+        self._evicted_results = []
+
+    def record(self, prompt, items=None):
+        """Count a request for prompt, and the items it was parsed into"""
+        key = normalize_prompt(prompt)
+        self.prompt_counts[key] += 1
+        self.prompts.setdefault(key, prompt)
+        for item in items or []:
+            self.item_counts[normalize_prompt(item)] += 1
+
+    def take(self, prompt):
+        """Return a stocked result for prompt, or None"""
+        key = normalize_prompt(prompt)
+        stock = self.stock.get(key)
+        now = time.time()
+        while stock:
+            created_at, result = stock.popleft()
+            if created_at + self.ttl >= now:
+                self.hits += 1
+                return result
+            self.evicted += 1
+            self._evicted_results.append(result)
+        self.misses += 1
+        return None
+
+    def top_themes(self):
+        return [key for key, _ in self.prompt_counts.most_common(self.max_themes)]
+
+    def _decay_counts(self):
+        # Let old trends fade so the pool follows what is popular now
+        if time.monotonic() - self._last_decay < self.decay_interval:
+            return
+        self._last_decay = time.monotonic()
+        for counts in (self.prompt_counts, self.item_counts):
+            for key in list(counts):
+                counts[key] *= self.decay
+                if counts[key] < 0.5:
+                    del counts[key]
+        for key in list(self.prompts):
+            if key not in self.prompt_counts:
+                del self.prompts[key]
+
+    def _evict(self):
+        themes = set(self.top_themes())
+        now = time.time()
+        for key in list(self.stock):
+            if key not in themes:
+                stock = self.stock.pop(key)
+                self.evicted += len(stock)
+                self._evicted_results.extend(result for _, result in stock)
+                continue
+            stock = self.stock[key]
+            while stock and stock[0][0] + self.ttl < now:
+                self._evicted_results.append(stock.popleft()[1])
+                self.evicted += 1
+
+    async def _discard_evicted(self):
+        results, self._evicted_results = self._evicted_results, []
+        if self.discard is None:
+            return
+        for result in results:
+            try:
+                await self.discard(result)
+            except Exception as e:
+                print(f"Warm pool discard error: {str(e)}")
+
+    async def refill_once(self):
+        """Generate one result for the most popular under-stocked theme
+
+        Returns True if something was generated.
+        """
+        self._decay_counts()
+        self._evict()
+        await self._discard_evicted()
+        for key in self.top_themes():
+            stock = self.stock.setdefault(key, deque())
+            if len(stock) >= self.stock_per_theme:
+                continue
+            result = await self.generate(self.prompts.get(key, key))
+            if result.get("success"):
+                stock.append((time.time(), result))
+                self.generated += 1
+                return True
+        return False
+
+    async def run(self):
+        """Background loop: refill while there is spare capacity"""
+        while True:
+            try:
+                if not self.can_refill() or not await self.refill_once():
+                    await asyncio.sleep(self.interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warm pool refill error: {str(e)}")
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "generated": self.generated,
+            "evicted": self.evicted,
+            "stock": {key: len(stock) for key, stock in self.stock.items() if stock},
+            "top_themes": self.top_themes()[:10],
+            "top_items": [key for key, _ in self.item_counts.most_common(10)]
+        }
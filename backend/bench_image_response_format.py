@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+# Check OpenAI API key
+if not os.getenv("OPENAI_API_KEY"):
+    print("Error: OPENAI_API_KEY is not set in the .env file")
+    sys.exit(1)
+
+from app.utils.ai import build_icon_prompt, request_image
+from app.utils.http import download_bytes, close_http_client
+
+async def time_url_mode(icon_prompt):
+    """Generate with response_format=url, then download the image (two hops)"""
+    start = time.perf_counter()
+    image_url, _ = await request_image(icon_prompt, "url")
+    generated = time.perf_counter()
+    image_data = await download_bytes(image_url)
+    done = time.perf_counter()
+    return generated - start, done - generated, len(image_data or b"")
+
+async def time_b64_mode(icon_prompt):
+    """Generate with response_format=b64_json; the bytes arrive with the response"""
+    start = time.perf_counter()
+    _, image_data = await request_image(icon_prompt, "b64_json")
+    done = time.perf_counter()
+    return done - start, 0.0, len(image_data)
+
+def summarize(name, samples):
+    totals = [generate + fetch for generate, fetch, _ in samples]
+    fetches = [fetch for _, fetch, _ in samples]
+    print(f"\n{name} ({len(samples)} runs)")
+    print(f"  total  mean {statistics.mean(totals):.2f}s  median {statistics.median(totals):.2f}s  max {max(totals):.2f}s")
+    print(f"  fetch  mean {statistics.mean(fetches):.2f}s")
+    print(f"  bytes  mean {statistics.mean(size for _, _, size in samples):.0f}")
+
+async def main(runs, prompt):
+    icon_prompt = build_icon_prompt(prompt)
+    url_samples = []
+    b64_samples = []
+
+    # Interleave the modes so both see the same upstream conditions
+    for run in range(runs):
+        print(f"Run {run + 1}/{runs}...")
+        url_samples.append(await time_url_mode(icon_prompt))
+        b64_samples.append(await time_b64_mode(icon_prompt))
+
+    summarize("response_format=url + download", url_samples)
+    summarize("response_format=b64_json", b64_samples)
+    await close_http_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare DALL-E url and b64_json response modes")
+    parser.add_argument("--runs", type=int, default=3, help="Generations per mode (each one is billed)")
+    parser.add_argument("--prompt", default="Bubble tea", help="Item to generate")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.runs, args.prompt))
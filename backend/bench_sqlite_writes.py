@@ -0,0 +1,85 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import secrets
+import tempfile
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config.database import Base, create_engines, create_session_factory
+from app.models import User
+
+# Compares write throughput of the old SQLite setup (rollback journal, a new
+# connection per session) with the production profile (WAL, tuned pragmas, one
+# serialized writer and read-only readers) under concurrent nonce updates:
+#   python bench_sqlite_writes.py --workers 32 --writes 50
+
+def old_profile(url):
+    engine = create_async_engine(url, connect_args={"check_same_thread": False})
+    return engine, engine
+
+async def run(name, make_engines, workers, writes):
+    """Each worker rotates the nonce of its own user `writes` times, like /auth/nonce"""
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    url = f"sqlite+aiosqlite:///{path}"
+    write_engine, read_engine = make_engines(url)
+    async with write_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            User.__table__.insert(),
+            [{"wallet_address": f"0xbench{i}", "nonce": secrets.token_hex(16)} for i in range(workers)]
+        )
+    SessionFactory = create_session_factory(write_engine, read_engine)
+    errors = []
+    latencies = []
+
+    async def worker(i):
+        for _ in range(writes):
+            started = time.perf_counter()
+            try:
+                async with SessionFactory() as db:
+                    user = await db.scalar(select(User).where(User.wallet_address == f"0xbench{i}"))
+                    user.nonce = secrets.token_hex(16)
+                    await db.commit()
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(str(e).splitlines()[0])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(workers)))
+    elapsed = time.perf_counter() - started
+
+    async with write_engine.connect() as conn:
+        journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+    await write_engine.dispose()
+    if read_engine is not write_engine:
+        await read_engine.dispose()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0
+    print(f"{name} (journal_mode={journal_mode})")
+    print(f"  Committed: {len(latencies)}/{workers * writes} in {elapsed:.2f}s ({len(latencies) / elapsed:.0f} writes/s)")
+    print(f"  p95 latency: {p95:.1f} ms")
+    print(f"  Errors: {len(errors)}" + (f" (e.g. {errors[0]})" if errors else ""))
+    return len(latencies) / elapsed
+
+async def main(workers, writes):
+    before = await run("Before: default engine", old_profile, workers, writes)
+    after = await run("After: SQLite profile", create_engines, workers, writes)
+    print(f"\nThroughput: {after / before:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite write throughput before and after the production profile")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent writers")
+    parser.add_argument("--writes", type=int, default=50, help="Writes per worker")
+    args = parser.parse_args()
+    asyncio.run(main(args.workers, args.writes))
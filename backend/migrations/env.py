@@ -0,0 +1,56 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.config.database import DATABASE_URL, Base, engine
+import app.models  # noqa: F401 (registers the models on Base)
+
+config = context.config
+
+# Keep the app's logging setup when migrations run from startup
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    """Emit the migration SQL for DATABASE_URL without connecting (alembic upgrade head --sql)"""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def do_run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most constraints, so autogenerate table changes as batch copies
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_async_migrations():
+    # Uses the app's writer engine, so SQLite migrations get the same pragmas
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Called from the app with a sync connection (see app.config.database.run_migrations)
+        do_run_migrations(connection)
+    else:
+        asyncio.run(run_async_migrations())
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
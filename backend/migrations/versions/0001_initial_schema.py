@@ -0,0 +1,110 @@
+"""initial schema
+
+The tables as created by Base.metadata.create_all before migrations were
+introduced. Databases created that way can be brought under Alembic with
+`alembic stamp 0001` followed by `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 11:38:22.993871
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('wallet_address', sa.String(), nullable=True),
+    sa.Column('nonce', sa.String(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_nonce', 'users', ['nonce'], unique=False)
+    op.create_index('ix_users_wallet_address', 'users', ['wallet_address'], unique=True)
+
+    op.create_table('meme_soldiers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=True),
+    sa.Column('token_id', sa.String(), nullable=True),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('prompt', sa.Text(), nullable=True),
+    sa.Column('contract_address', sa.String(), nullable=True),
+    sa.Column('coin_icon_url', sa.String(), nullable=True),
+    sa.Column('coin_icon_variants', sa.JSON(), nullable=True),
+    sa.Column('deployed_to_battlefield', sa.Boolean(), nullable=True),
+    sa.Column('token_amount', sa.Float(), nullable=True),
+    sa.Column('token_amount_deployed', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_meme_soldiers_id', 'meme_soldiers', ['id'], unique=False)
+    op.create_index('ix_meme_soldiers_name', 'meme_soldiers', ['name'], unique=False)
+    op.create_index('ix_meme_soldiers_token_id', 'meme_soldiers', ['token_id'], unique=False)
+
+    # battles.winner_id and battle_participants.battle_id reference each other,
+    # so the winner foreign key is added once both tables exist
+    op.create_table('battles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'ACTIVE', 'COMPLETED', 'CANCELLED', name='battlestatus'), nullable=True),
+    sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('winner_id', sa.Integer(), nullable=True),
+    sa.Column('transaction_hash', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_battles_id', 'battles', ['id'], unique=False)
+    op.create_index('ix_battles_name', 'battles', ['name'], unique=False)
+
+    op.create_table('battle_participants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('battle_id', sa.Integer(), nullable=True),
+    sa.Column('soldier_id', sa.Integer(), nullable=True),
+    sa.Column('votes', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['battle_id'], ['battles.id'], ),
+    sa.ForeignKeyConstraint(['soldier_id'], ['meme_soldiers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_battle_participants_id', 'battle_participants', ['id'], unique=False)
+
+    with op.batch_alter_table('battles') as batch_op:
+        batch_op.create_foreign_key('fk_battles_winner_id', 'battle_participants', ['winner_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('battles') as batch_op:
+        batch_op.drop_constraint('fk_battles_winner_id', type_='foreignkey')
+
+    op.drop_index('ix_battle_participants_id', table_name='battle_participants')
+    op.drop_table('battle_participants')
+    op.drop_index('ix_battles_name', table_name='battles')
+    op.drop_index('ix_battles_id', table_name='battles')
+    op.drop_table('battles')
+    sa.Enum(name='battlestatus').drop(op.get_bind(), checkfirst=True)
+    op.drop_index('ix_meme_soldiers_token_id', table_name='meme_soldiers')
+    op.drop_index('ix_meme_soldiers_name', table_name='meme_soldiers')
+    op.drop_index('ix_meme_soldiers_id', table_name='meme_soldiers')
+    op.drop_table('meme_soldiers')
+    op.drop_index('ix_users_wallet_address', table_name='users')
+    op.drop_index('ix_users_nonce', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
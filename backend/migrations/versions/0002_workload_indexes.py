@@ -0,0 +1,59 @@
+"""workload indexes
+
+Composite indexes matched to the hot queries, which test_query_plans.py
+checks with EXPLAIN:
+- a user's soldiers newest first: meme_soldiers (owner_id, created_at)
+- a battle's ranking: battle_participants (battle_id, votes)
+- active battles by end time: battles (status, end_time)
+
+battle_participants also gets a unique (battle_id, soldier_id), so a soldier
+can only join a battle once. Existing duplicates must be removed before
+upgrading.
+
+Dropped: users.nonce (the nonce is only read from the user's own row), the
+name indexes (nothing searches by name) and the ix_*_id indexes, which
+duplicate the primary keys.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 11:38:51.129591
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_meme_soldiers_owner_id_created_at', 'meme_soldiers', ['owner_id', 'created_at'], unique=False)
+    op.create_index('ix_battle_participants_battle_id_votes', 'battle_participants', ['battle_id', 'votes'], unique=False)
+    op.create_index('uq_battle_participants_battle_id_soldier_id', 'battle_participants', ['battle_id', 'soldier_id'], unique=True)
+    op.create_index('ix_battles_status_end_time', 'battles', ['status', 'end_time'], unique=False)
+
+    op.drop_index('ix_users_nonce', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_index('ix_meme_soldiers_id', table_name='meme_soldiers')
+    op.drop_index('ix_meme_soldiers_name', table_name='meme_soldiers')
+    op.drop_index('ix_battles_id', table_name='battles')
+    op.drop_index('ix_battles_name', table_name='battles')
+    op.drop_index('ix_battle_participants_id', table_name='battle_participants')
+
+
+def downgrade():
+    op.create_index('ix_battle_participants_id', 'battle_participants', ['id'], unique=False)
+    op.create_index('ix_battles_name', 'battles', ['name'], unique=False)
+    op.create_index('ix_battles_id', 'battles', ['id'], unique=False)
+    op.create_index('ix_meme_soldiers_name', 'meme_soldiers', ['name'], unique=False)
+    op.create_index('ix_meme_soldiers_id', 'meme_soldiers', ['id'], unique=False)
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+    op.create_index('ix_users_nonce', 'users', ['nonce'], unique=False)
+
+    op.drop_index('ix_battles_status_end_time', table_name='battles')
+    op.drop_index('uq_battle_participants_battle_id_soldier_id', table_name='battle_participants')
+    op.drop_index('ix_battle_participants_battle_id_votes', table_name='battle_participants')
+    op.drop_index('ix_meme_soldiers_owner_id_created_at', table_name='meme_soldiers')
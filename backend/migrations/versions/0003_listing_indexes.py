@@ -0,0 +1,36 @@
+"""listing indexes
+
+Indexes for the keyset-paginated listings, which page newest first by
+(created_at, id):
+- soldiers by deployed status: meme_soldiers (deployed_to_battlefield, created_at)
+- battles by status: battles (status, created_at)
+- all battles: battles (created_at)
+
+Listing a wallet's soldiers already uses meme_soldiers (owner_id, created_at)
+from 0002.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:41:22.757979
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_meme_soldiers_deployed_created_at', 'meme_soldiers', ['deployed_to_battlefield', 'created_at'], unique=False)
+    op.create_index('ix_battles_status_created_at', 'battles', ['status', 'created_at'], unique=False)
+    op.create_index('ix_battles_created_at', 'battles', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_battles_created_at', table_name='battles')
+    op.drop_index('ix_battles_status_created_at', table_name='battles')
+    op.drop_index('ix_meme_soldiers_deployed_created_at', table_name='meme_soldiers')
@@ -0,0 +1,29 @@
+"""soldier provider
+
+Records which image provider made a soldier's image ("openai" or "pixel"),
+so procedural fallbacks can be told apart from DALL-E images. Existing rows
+are left NULL.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:05:12.418203
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('meme_soldiers') as batch_op:
+        batch_op.add_column(sa.Column('provider', sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('meme_soldiers') as batch_op:
+        batch_op.drop_column('provider')
@@ -6,11 +6,22 @@ from app.main import app
 
 if __name__ == "__main__":
     # For local development only
+    import asyncio
     import uvicorn
     from app.config.settings import settings
+    from app.config.database import run_migrations, dispose_engine
+
+    async def migrate():
+        try:
+            await run_migrations()
+        finally:
+            await dispose_engine()
     
     # Create meme_images directory if it doesn't exist
     os.makedirs(settings.MEME_STORAGE_PATH, exist_ok=True)
+
+    # Apply migrations once here rather than in each server process
+    asyncio.run(migrate())
     
     # Start the server
     uvicorn.run(
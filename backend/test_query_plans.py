@@ -0,0 +1,128 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from sqlalchemy import create_engine, select
+
+from app.config.database import upgrade_database
+from app.models import User, MemeSoldier, Battle, BattleParticipant, BattleStatus
+from app.utils.pagination import encode_cursor, keyset_page
+
+# The queries on the request path, each with the index it must use. Checked
+# with EXPLAIN QUERY PLAN on a SQLite database built by the migrations:
+#   python test_query_plans.py   (or: pytest test_query_plans.py)
+now = datetime.now(timezone.utc)
+cursor = encode_cursor(now, 100)
+HOT_QUERIES = {
+    "user by wallet (auth)": (
+        select(User).where(User.wallet_address == "0xabc"),
+        "ix_users_wallet_address"
+    ),
+    "owner's soldiers, newest first": (
+        select(MemeSoldier.id, MemeSoldier.name, MemeSoldier.created_at)
+        .where(MemeSoldier.owner_id == 1)
+        .order_by(MemeSoldier.created_at.desc(), MemeSoldier.id.desc())
+        .limit(20),
+        "ix_meme_soldiers_owner_id_created_at"
+    ),
+    "owner's soldiers, next page": (
+        keyset_page(
+            select(MemeSoldier.id, MemeSoldier.name).where(MemeSoldier.owner_id == 1),
+            MemeSoldier.created_at, MemeSoldier.id, cursor
+        ),
+        "ix_meme_soldiers_owner_id_created_at"
+    ),
+    "deployed soldiers, next page": (
+        keyset_page(
+            select(MemeSoldier.id, MemeSoldier.name).where(MemeSoldier.deployed_to_battlefield == True),
+            MemeSoldier.created_at, MemeSoldier.id, cursor
+        ),
+        "ix_meme_soldiers_deployed_created_at"
+    ),
+    "owner's soldier by id (mint)": (
+        select(MemeSoldier).where(MemeSoldier.id == 1, MemeSoldier.owner_id == 1),
+        "INTEGER PRIMARY KEY"
+    ),
+    "battle ranking by votes": (
+        select(BattleParticipant.soldier_id, BattleParticipant.votes)
+        .where(BattleParticipant.battle_id == 1)
+        .order_by(BattleParticipant.votes.desc()),
+        "ix_battle_participants_battle_id_votes"
+    ),
+    "soldier in battle": (
+        select(BattleParticipant).where(BattleParticipant.battle_id == 1, BattleParticipant.soldier_id == 2),
+        "uq_battle_participants_battle_id_soldier_id"
+    ),
+    "active battles by end time": (
+        select(Battle.id, Battle.name, Battle.end_time)
+        .where(Battle.status == BattleStatus.ACTIVE, Battle.end_time > now)
+        .order_by(Battle.end_time),
+        "ix_battles_status_end_time"
+    ),
+    "battles by status, next page": (
+        keyset_page(
+            select(Battle.id, Battle.name).where(Battle.status == BattleStatus.ACTIVE),
+            Battle.created_at, Battle.id, cursor
+        ),
+        "ix_battles_status_created_at"
+    ),
+    "all battles, next page": (
+        keyset_page(select(Battle.id, Battle.name), Battle.created_at, Battle.id, cursor),
+        "ix_battles_created_at"
+    ),
+}
+
+def explain(connection, statement):
+    """Return the EXPLAIN QUERY PLAN detail lines of a statement
+
+    Plans don't depend on the bound values, so every parameter is bound as NULL.
+    """
+    compiled = statement.compile(dialect=connection.dialect)
+    params = (None,) * len(compiled.positiontup or ())
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return [row[-1] for row in rows]
+
+def plan_problems(plan, index):
+    """Full scans, sorts that the index should have avoided, or the expected index not being used"""
+    problems = [
+        line for line in plan
+        if (line.startswith("SCAN ") and " USING " not in line) or "TEMP B-TREE" in line
+    ]
+    if not any(index in line for line in plan):
+        problems.append(f"{index} not used")
+    return problems
+
+def test_hot_queries_use_indexes():
+    """Every hot query is an index search, without a full scan or a separate sort"""
+    path = os.path.join(tempfile.mkdtemp(), "plans.db")
+    engine = create_engine(f"sqlite:///{path}")
+    failures = {}
+    try:
+        with engine.begin() as connection:
+            upgrade_database(connection)
+        with engine.connect() as connection:
+            for name, (statement, index) in HOT_QUERIES.items():
+                plan = explain(connection, statement)
+                print(f"{name}: {' | '.join(plan)}")
+                problems = plan_problems(plan, index)
+                if problems:
+                    failures[name] = problems
+    finally:
+        engine.dispose()
+
+    assert not failures, f"Queries not served by their index: {failures}"
+
+if __name__ == "__main__":
+    try:
+        test_hot_queries_use_indexes()
+        print("\nQuery plan test passed")
+    except AssertionError as e:
+        print(f"\nQuery plan test failed: {e}")
+        sys.exit(1)
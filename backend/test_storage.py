@@ -0,0 +1,57 @@
+import os
+import sys
+import uuid
+import asyncio
+from dotenv import load_dotenv
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+load_dotenv()
+
+from app.utils.storage import get_storage
+from app.utils.http import close_http_client
+
+# Run against a local MinIO with e.g.:
+#   docker run -p 9000:9000 -e MINIO_ROOT_USER=minio -e MINIO_ROOT_PASSWORD=minio123 minio/minio server /data
+#   (create the bucket, then) STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET=meme-images \
+#   S3_ACCESS_KEY_ID=minio S3_SECRET_ACCESS_KEY=minio123 python test_storage.py
+
+async def round_trip():
+    """Put, check, read back and resolve the URL of an object"""
+    storage = get_storage()
+    if storage is None:
+        print("Error: no storage backend is configured")
+        return False
+    print(f"Testing {storage.name} storage")
+
+    key = f"storage_test_{uuid.uuid4().hex}.png"
+    data = os.urandom(1024)
+
+    url = await storage.put(key, data)
+    print(f"  Stored at: {url}")
+    print(f"  URL: {storage.url(key)}")
+
+    exists = await storage.exists(key)
+    print(f"  Exists: {exists}")
+
+    read_back = await storage.get(key)
+    matches = read_back == data
+    print(f"  Read back matches: {matches}")
+
+    missing = await storage.exists(f"missing_{key}")
+    print(f"  Missing key exists: {missing}")
+
+    await close_http_client()
+    return exists and matches and not missing
+
+def test_round_trip():
+    assert asyncio.run(round_trip()), "Storage round trip failed"
+
+if __name__ == "__main__":
+    try:
+        test_round_trip()
+        print("\nStorage test passed")
+    except AssertionError as e:
+        print(f"\nStorage test failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,46 @@
+import os
+import sys
+import asyncio
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.upstream import CircuitBreaker, UpstreamClient, guarded_call, latency_budget
+
+# Checks that callers queued in the rate limiter past their latency budget don't
+# open the circuit breaker of a healthy upstream:
+#   python test_upstream.py   (or: pytest test_upstream.py)
+
+async def burst_past_budget(calls=12, budget=1.5):
+    """Fire a burst of fast upstream calls at 60/min, more than the bucket holds"""
+    upstream = UpstreamClient({"model": (60, calls)})
+    breaker = CircuitBreaker("image", failure_threshold=3, reset_timeout=30)
+
+    async def upstream_call():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def one():
+        try:
+            return await guarded_call(breaker, 0.0, lambda: upstream.call("model", upstream_call))
+        except asyncio.TimeoutError:
+            return "budget"
+
+    with latency_budget(budget):
+        results = await asyncio.gather(*[one() for _ in range(calls)])
+    return results, breaker
+
+def test_queueing_past_budget_keeps_breaker_closed():
+    results, breaker = asyncio.run(burst_past_budget())
+    print(f"ok: {results.count('ok')}, cut off by budget: {results.count('budget')}, breaker: {breaker.stats()}")
+    assert results.count("budget") > 0, "the burst should outrun the budget"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.consecutive_failures == 0
+
+if __name__ == "__main__":
+    try:
+        test_queueing_past_budget_keeps_breaker_closed()
+        print("\nUpstream test passed")
+    except AssertionError as e:
+        print(f"\nUpstream test failed: {e}")
+        sys.exit(1)